@@ -1,7 +1,22 @@
 import pygame
 import math
+import argparse
+import hashlib
+import os
+import queue
+import random
+import threading
+from collections import namedtuple
+import levelpack
+import mazegen
+import raybands
 from levels import LEVELS  # Importing levels from a separate file
 
+try:
+    import numpy as np  # Optional, enables the vectorized renderer
+except ImportError:
+    np = None
+
 # Initialize Pygame
 pygame.init()
 
@@ -18,7 +33,7 @@ GREEN = (0, 255, 0)
 
 # Game settings
 FOV = math.pi / 3  # Field of view
-NUM_RAYS = 120  # Number of rays cast
+NUM_RAYS = SCREEN_WIDTH  # Number of rays cast (one per screen column)
 MAX_DEPTH = 800  # Maximum ray distance
 SCALE = SCREEN_WIDTH // NUM_RAYS
 PLAYER_SPEED = 3
@@ -28,13 +43,24 @@ MOUSE_SENSITIVITY = 0.002
 # Map settings
 TILE_SIZE = 64
 current_level = 0
-MAP = LEVELS[current_level]["map"]  # Get map from levels
-MAP_WIDTH = len(MAP[0])
-MAP_HEIGHT = len(MAP)
+# Level grids, compiled from levels.py (and rebuilt when it changes) by the
+# first load_level, so that importing this module writes no files
+LEVEL_GRIDS = None
+MAP = None  # Grid of the current level
+MAP_WIDTH = 0
+MAP_HEIGHT = 0
+
+# Screen, opened by init_display() so that worker processes importing this
+# module do not open windows of their own
+screen = None
 
-# Initialize screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Doom-like Sandbox Game")
+def init_display():
+    global screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Doom-like Sandbox Game")
+
+# Immutable copy of what the renderer needs from the player
+PlayerState = namedtuple("PlayerState", ["x", "y", "z", "angle", "view_offset"])
 
 # Player class
 class Player:
@@ -54,30 +80,30 @@ class Player:
 
         # Move forward
         if keys[pygame.K_w]:
-            if MAP[int((self.y + dy) // TILE_SIZE)][int(self.x // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int(self.x // TILE_SIZE), int((self.y + dy) // TILE_SIZE)):
                 self.y += dy
-            if MAP[int(self.y // TILE_SIZE)][int((self.x + dx) // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int((self.x + dx) // TILE_SIZE), int(self.y // TILE_SIZE)):
                 self.x += dx
 
         # Move backward
         if keys[pygame.K_s]:
-            if MAP[int((self.y - dy) // TILE_SIZE)][int(self.x // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int(self.x // TILE_SIZE), int((self.y - dy) // TILE_SIZE)):
                 self.y -= dy
-            if MAP[int(self.y // TILE_SIZE)][int((self.x - dx) // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int((self.x - dx) // TILE_SIZE), int(self.y // TILE_SIZE)):
                 self.x -= dx
 
         # Strafe left
         if keys[pygame.K_a]:
-            if MAP[int((self.y - cos_a * PLAYER_SPEED) // TILE_SIZE)][int(self.x // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int(self.x // TILE_SIZE), int((self.y - cos_a * PLAYER_SPEED) // TILE_SIZE)):
                 self.y -= cos_a * PLAYER_SPEED
-            if MAP[int(self.y // TILE_SIZE)][int((self.x + sin_a * PLAYER_SPEED) // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int((self.x + sin_a * PLAYER_SPEED) // TILE_SIZE), int(self.y // TILE_SIZE)):
                 self.x += sin_a * PLAYER_SPEED
 
         # Strafe right
         if keys[pygame.K_d]:
-            if MAP[int((self.y + cos_a * PLAYER_SPEED) // TILE_SIZE)][int(self.x // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int(self.x // TILE_SIZE), int((self.y + cos_a * PLAYER_SPEED) // TILE_SIZE)):
                 self.y += cos_a * PLAYER_SPEED
-            if MAP[int(self.y // TILE_SIZE)][int((self.x - sin_a * PLAYER_SPEED) // TILE_SIZE)] != "#":
+            if not MAP.is_wall(int((self.x - sin_a * PLAYER_SPEED) // TILE_SIZE), int(self.y // TILE_SIZE)):
                 self.x -= sin_a * PLAYER_SPEED
 
         # Vertical movement (simulating stairs or elevation)
@@ -86,100 +112,682 @@ class Player:
         if keys[pygame.K_LSHIFT]:  # Descend
             self.z = max(self.z - 1, 0)
 
+    def snapshot(self):
+        return PlayerState(self.x, self.y, self.z, self.angle, self.view_offset)
+
     def rotate_with_mouse(self):
         mouse_dx, mouse_dy = pygame.mouse.get_rel()  # Get mouse movement (x, y)
         self.angle += mouse_dx * MOUSE_SENSITIVITY
         self.view_offset += mouse_dy * 5  # Adjust vertical look
         self.view_offset = max(-100, min(100, self.view_offset))  # Limit range
 
-# Raycasting function
-def cast_rays(player):
+# The tiles that rays cast from a position can reach: the whole map when it is
+# small, otherwise a square of tiles copied out of the map around the position,
+# so that casting never touches more than a fixed area of a huge maze
+VIEW_RADIUS = MAX_DEPTH // TILE_SIZE + 1
+
+class ViewWindow:
+    def __init__(self, cells, x0, y0, width, height):
+        self.cells = cells  # Flat byte grid, cells[y * width + x]
+        self.x0 = x0  # Map tile of the window's top-left corner
+        self.y0 = y0
+        self.width = width
+        self.height = height
+        self.grid = None  # NumPy copy (True = wall), built on first use
+
+_full_windows = {}
+
+def full_window():
+    window = _full_windows.get(id(MAP))
+    if window is None:
+        window = ViewWindow(MAP.cells, 0, 0, MAP_WIDTH, MAP_HEIGHT)
+        _full_windows[id(MAP)] = window
+    return window
+
+def view_window(x, y):
+    size = 2 * VIEW_RADIUS + 1
+    if isinstance(MAP, levelpack.LevelGrid) and MAP_WIDTH <= size and MAP_HEIGHT <= size:
+        return full_window()
+    x0 = int(x // TILE_SIZE) - VIEW_RADIUS
+    y0 = int(y // TILE_SIZE) - VIEW_RADIUS
+    return ViewWindow(MAP.window(x0, y0, size, size), x0, y0, size, size)
+
+# Grid traversal (DDA): step from one tile boundary to the next along the ray
+# instead of marching one unit at a time, so the cost depends on the number of
+# tiles crossed rather than on the distance travelled. The kernel itself lives
+# in raybands so that process workers can run it too.
+def cast_ray(x, y, angle, window=None):
+    window = window or view_window(x, y)
+    return raybands.cast_ray(
+        window.cells,
+        window.width,
+        window.height,
+        x - window.x0 * TILE_SIZE,  # Work in window coordinates
+        y - window.y0 * TILE_SIZE,
+        angle,
+        TILE_SIZE,
+        MAX_DEPTH,
+    )
+
+# Raycasting function (columns are laid out for the target surface, the screen by default)
+# When a depth_buffer list is given, it is filled with the fish-eye corrected
+# wall distance of every column (inf where no wall was hit)
+def cast_rays(player, num_rays=NUM_RAYS, surface=None, depth_buffer=None, window=None):
+    window = window or view_window(player.x, player.y)
+    start_angle = player.angle - FOV / 2
+    depths = []
+    for ray in range(num_rays):
+        hit = cast_ray(player.x, player.y, start_angle + ray * (FOV / num_rays), window)
+        depths.append(hit[0] if hit else math.inf)
+    return ray_columns(player, depths, surface, depth_buffer)
+
+# Turn the hit distance of every column (inf for no hit) into the column tuples draw_3d draws
+def ray_columns(player, depths, surface=None, depth_buffer=None):
+    view_width, view_height = (surface or screen).get_size()
+    num_rays = len(depths)
+    scale = view_width // num_rays
     rays = []
     start_angle = player.angle - FOV / 2
-    for ray in range(NUM_RAYS):
-        angle = start_angle + ray * (FOV / NUM_RAYS)
-        sin_a = math.sin(angle)
-        cos_a = math.cos(angle)
-
-        # Ray tracing
-        for depth in range(1, MAX_DEPTH):
-            target_x = player.x + depth * cos_a
-            target_y = player.y + depth * sin_a
-
-            if (
-                0 <= int(target_x // TILE_SIZE) < MAP_WIDTH
-                and 0 <= int(target_y // TILE_SIZE) < MAP_HEIGHT
-            ):
-                if MAP[int(target_y // TILE_SIZE)][int(target_x // TILE_SIZE)] == "#":
-                    depth *= math.cos(player.angle - angle)  # Remove fish-eye effect
-                    height = TILE_SIZE * SCREEN_HEIGHT / (depth + 0.001)
-                    height *= 1 - (player.z / 100)  # Simulate elevation
-                    color = 255 / (1 + depth * depth * 0.0001)
-                    y_offset = player.view_offset  # Apply vertical look
-                    rays.append((ray * SCALE, SCREEN_HEIGHT // 2 - height // 2 + y_offset, SCALE, height, color))
-                    break
+    for ray, depth in enumerate(depths):
+        if depth == math.inf:
+            if depth_buffer is not None:
+                depth_buffer.append(math.inf)
+            continue
+
+        angle = start_angle + ray * (FOV / num_rays)
+        depth *= math.cos(player.angle - angle)  # Remove fish-eye effect
+        if depth_buffer is not None:
+            depth_buffer.append(depth)
+        height = TILE_SIZE * view_height / (depth + 0.001)
+        height *= 1 - (player.z / 100)  # Simulate elevation
+        color = 255 / (1 + depth * depth * 0.0001)
+        y_offset = player.view_offset * view_height / SCREEN_HEIGHT  # Apply vertical look
+        rays.append((ray * scale, view_height // 2 - height // 2 + y_offset, scale, height, color))
     return rays
 
 # Draw 3D view
-def draw_3d(rays):
+def draw_3d(rays, surface=None):
+    surface = surface or screen
     for ray in rays:
         x, y, width, height, color = ray
-        pygame.draw.rect(screen, (color, color, color), (x, y, width, height))
-
-# Draw top-down map
-def draw_top_down():
-    mini_map_scale = 40 / (MAP_WIDTH * TILE_SIZE)  # Fit the map within 40px width
-    mini_tile_size = TILE_SIZE * mini_map_scale
-
-    for y, row in enumerate(MAP):
-        for x, char in enumerate(row):
-            color = GRAY if char == "#" else BLACK
-            rect = pygame.Rect(
-                x * mini_tile_size,
-                y * mini_tile_size,
-                mini_tile_size,
-                mini_tile_size,
-            )
-            pygame.draw.rect(screen, color, rect)
+        pygame.draw.rect(surface, (color, color, color), (x, y, width, height))
+
+# NumPy copy of a view window (True = wall)
+def wall_grid(window):
+    if window.grid is None:
+        window.grid = np.frombuffer(window.cells, dtype=np.uint8).reshape(window.height, window.width) == levelpack.WALL
+    return window.grid
+
+# Vectorized DDA traversal: the same walk as cast_ray, but for arrays of rays
+# (origins may be scalars or arrays matching the angles) advanced all at once
+def dda_numpy(x, y, angles, window):
+    grid = wall_grid(window)
+    width = window.width
+    height = window.height
+    count = angles.shape[0]
+    x = np.broadcast_to(np.asarray(x, dtype=float), angles.shape) - window.x0 * TILE_SIZE
+    y = np.broadcast_to(np.asarray(y, dtype=float), angles.shape) - window.y0 * TILE_SIZE
+    sin_a = np.sin(angles)
+    cos_a = np.cos(angles)
+    map_x = (x // TILE_SIZE).astype(np.intp)
+    map_y = (y // TILE_SIZE).astype(np.intp)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta_x = np.abs(TILE_SIZE / cos_a)
+        delta_y = np.abs(TILE_SIZE / sin_a)
+        step_x = np.where(cos_a >= 0, 1, -1)
+        step_y = np.where(sin_a >= 0, 1, -1)
+        side_x = np.where(cos_a >= 0, (map_x + 1) * TILE_SIZE - x, x - map_x * TILE_SIZE) / np.abs(cos_a)
+        side_y = np.where(sin_a >= 0, (map_y + 1) * TILE_SIZE - y, y - map_y * TILE_SIZE) / np.abs(sin_a)
+    side_x[np.isnan(side_x)] = np.inf
+    side_y[np.isnan(side_y)] = np.inf
+
+    depth = np.full(count, np.inf)
+    side = np.zeros(count, dtype=np.int8)
+    active = np.ones(count, dtype=bool)
+
+    # A ray can cross at most width + height tiles before leaving the window
+    for _ in range(width + height):
+        step_in_x = side_x < side_y
+        dist = np.where(step_in_x, side_x, side_y)
+        move_x = active & step_in_x
+        move_y = active & ~step_in_x
+        side_x[move_x] += delta_x[move_x]
+        map_x[move_x] += step_x[move_x]
+        side_y[move_y] += delta_y[move_y]
+        map_y[move_y] += step_y[move_y]
+
+        inside = (dist < MAX_DEPTH) & (0 <= map_x) & (map_x < width) & (0 <= map_y) & (map_y < height)
+        active &= inside
+        hit = active & grid[np.clip(map_y, 0, height - 1), np.clip(map_x, 0, width - 1)]
+        depth[hit] = dist[hit]
+        side[hit] = ~step_in_x[hit]
+        active &= ~hit
+        if not active.any():
+            break
+
+    with np.errstate(invalid="ignore"):
+        offset = np.where(side == 0, y + depth * sin_a, x + depth * cos_a) % TILE_SIZE
+    return depth, side, offset
+
+# Vectorized raycasting: every ray of the frame cast at once
+def cast_rays_numpy(player, num_rays=NUM_RAYS, window=None):
+    angles = player.angle - FOV / 2 + np.arange(num_rays) * (FOV / num_rays)
+    depth, side, offset = dda_numpy(player.x, player.y, angles, window or view_window(player.x, player.y))
+    return angles, depth, side, offset
+
+# Baked ray tables: for every level the distance to the first wall is
+# precomputed on a lattice of BAKE_SUBDIV x BAKE_SUBDIV points per tile and
+# BAKE_ANGLES directions and cached on disk. Each entry holds two uint16: the
+# distance in 1/8 pixel units (0 = point inside a wall, 0xFFFF = no wall within
+# MAX_DEPTH) and the grid line that was hit (line index * 2 + side), with
+# BAKE_EDGE set when a neighbouring entry hit another line, so that corners
+# poking between two lattice points are cast exactly rather than interpolated.
+# On the bundled 10 x 10 levels this does not pay off: the lookup alone costs
+# about half a numpy cast, nearly half the rays still need casting exactly
+# (every view has corners in it), and a numpy cast costs its full loop however
+# few rays it gets, so "baked" ends up slower than "numpy" and takes 2-3 MB of
+# disk per level. It is kept for comparison, not as a speed-up.
+BAKE_SUBDIV = 4
+BAKE_ANGLES = 360
+BAKE_EDGE = 0x8000
+BAKE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bake")
+BAKE_VERSION = 1
+
+_baked_tables = {}
+
+def map_hash():
+    key = f"{MAP_WIDTH}x{MAP_HEIGHT}|{BAKE_VERSION}|{TILE_SIZE}|{MAX_DEPTH}|{BAKE_SUBDIV}|{BAKE_ANGLES}|"
+    return hashlib.sha1(key.encode() + bytes(MAP.cells)).hexdigest()[:16]
+
+def bake_level():
+    window = full_window()
+    spacing = TILE_SIZE / BAKE_SUBDIV
+    sample_y, sample_x = np.mgrid[: MAP_HEIGHT * BAKE_SUBDIV, : MAP_WIDTH * BAKE_SUBDIV]
+    sample_x = (sample_x.ravel() + 0.5) * spacing
+    sample_y = (sample_y.ravel() + 0.5) * spacing
+    floor = ~wall_grid(window)[(sample_y // TILE_SIZE).astype(int), (sample_x // TILE_SIZE).astype(int)]
+
+    origin_x = np.repeat(sample_x[floor], BAKE_ANGLES)
+    origin_y = np.repeat(sample_y[floor], BAKE_ANGLES)
+    angles = np.tile(np.arange(BAKE_ANGLES) * (2 * math.pi / BAKE_ANGLES), int(floor.sum()))
+    depth, side, _ = dda_numpy(origin_x, origin_y, angles, window)
+
+    hit = np.isfinite(depth)
+    line = np.where(side == 0, origin_x + np.where(hit, depth, 0) * np.cos(angles), origin_y + np.where(hit, depth, 0) * np.sin(angles))
+    table = np.zeros((sample_x.size, BAKE_ANGLES, 2), dtype=np.uint16)
+    table[floor, :, 0] = np.where(hit, np.clip(depth * 8, 1, 0xFFFE), 0xFFFF).reshape(-1, BAKE_ANGLES)
+    table[floor, :, 1] = (np.round(line / TILE_SIZE) * 2 + side).reshape(-1, BAKE_ANGLES)
+    table = table.reshape(MAP_HEIGHT * BAKE_SUBDIV, MAP_WIDTH * BAKE_SUBDIV, BAKE_ANGLES, 2)
+
+    lines = table[..., 1]
+    edge = np.zeros(lines.shape, dtype=bool)
+    for axis in range(3):
+        for shift in (1, -1):
+            edge |= lines != np.roll(lines, shift, axis=axis)
+    table[..., 1] |= np.where(edge, BAKE_EDGE, 0).astype(np.uint16)
+    return table
+
+# Return the baked table of the current map, loading it from the disk cache
+# or baking it (and saving it) the first time the map is seen
+def baked_table():
+    table = _baked_tables.get(id(MAP))
+    if table is not None:
+        return table
+
+    path = os.path.join(BAKE_DIR, map_hash() + ".npy")
+    shape = (MAP_HEIGHT * BAKE_SUBDIV, MAP_WIDTH * BAKE_SUBDIV, BAKE_ANGLES, 2)
+    try:
+        table = np.load(path)
+    except (OSError, ValueError):
+        table = None
+    if table is None or table.shape != shape or table.dtype != np.uint16:
+        table = bake_level()
+        os.makedirs(BAKE_DIR, exist_ok=True)
+        np.save(path, table)
+    _baked_tables[id(MAP)] = table
+    return table
+
+# Raycasting from the baked table: interpolate between the 4 surrounding
+# lattice points and 2 nearest directions, and cast exactly only the rays
+# whose samples did not all hit the same wall line (corners, wall edges) or
+# fall inside walls
+def cast_rays_baked(player, num_rays=NUM_RAYS):
+    table = baked_table()
+    angles = player.angle - FOV / 2 + np.arange(num_rays) * (FOV / num_rays)
+
+    spacing = TILE_SIZE / BAKE_SUBDIV
+    fx = player.x / spacing - 0.5
+    fy = player.y / spacing - 0.5
+    x0 = min(max(int(fx), 0), table.shape[1] - 2)
+    y0 = min(max(int(fy), 0), table.shape[0] - 2)
+    wx = min(max(fx - x0, 0), 1)
+    wy = min(max(fy - y0, 0), 1)
+
+    fa = (angles % (2 * math.pi)) * (BAKE_ANGLES / (2 * math.pi))
+    a0 = fa.astype(np.intp) % BAKE_ANGLES
+    a1 = (a0 + 1) % BAKE_ANGLES
+    wa = fa - np.floor(fa)
+
+    corners = table[y0 : y0 + 2, x0 : x0 + 2]  # (2, 2, BAKE_ANGLES, 2)
+    samples = np.stack([corners[:, :, a0], corners[:, :, a1]]).reshape(8, num_rays, 2)
+    lines = samples[..., 1]
+    samples = samples[..., 0].astype(float)
+    pos = np.array([(1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx])
+    weights = np.concatenate([np.outer(pos, 1 - wa), np.outer(pos, wa)])
+    depth = (samples * weights).sum(axis=0) / 8
+
+    exact = (
+        (samples.min(axis=0) == 0)
+        | (samples.max(axis=0) == 0xFFFF)
+        | (lines.min(axis=0) != lines.max(axis=0))
+        | (lines.max(axis=0) & BAKE_EDGE != 0)
+    )
+    if exact.any():
+        depth[exact] = dda_numpy(player.x, player.y, angles[exact], full_window())[0]
+    return angles, depth
+
+# Draw 3D view from the vectorized rays, writing wall columns straight into the
+# surface pixels. Returns the depth buffer: the fish-eye corrected wall distance
+# of every column (inf where no wall was hit).
+def draw_3d_numpy(player, angles, depth, surface=None):
+    surface = surface or screen
+    view_width, view_height = surface.get_size()
+    scale = view_width // len(angles)
+    hit = np.isfinite(depth)
+    depth = np.where(hit, depth, MAX_DEPTH) * np.cos(player.angle - angles)  # Remove fish-eye effect
+    height = TILE_SIZE * view_height / (depth + 0.001)
+    height *= 1 - (player.z / 100)  # Simulate elevation
+    top = view_height // 2 - height // 2 + player.view_offset * view_height / SCREEN_HEIGHT
+    color = (255 / (1 + depth * depth * 0.0001)).astype(np.uint8)
+
+    rows = np.arange(view_height)
+    wall = (rows >= top[:, None]) & (rows < (top + height)[:, None]) & hit[:, None]
+    if scale > 1:
+        wall = np.repeat(wall, scale, axis=0)
+        color = np.repeat(color, scale)
+
+    if surface.get_bytesize() == 4:
+        # Gray maps to the same 32-bit value whatever the channel order
+        columns = np.where(wall, (color.astype(np.uint32) * 0x010101)[:, None], np.uint32(0))
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[: columns.shape[0]] = columns
+    else:
+        columns = np.where(wall, color[:, None], np.uint8(0))
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[: columns.shape[0]] = columns[:, :, None]
+    del pixels  # Unlock the surface
+    return np.where(hit, depth, np.inf)
+
+# Billboard sprites (decorations, pickups, enemies). They are drawn after the
+# walls, far to near, and tested against the walls' depth buffer: sprites
+# outside the field of view or completely hidden behind walls are skipped, and
+# the others are drawn only on the column slices where they are in front of
+# the wall.
+SPRITE_SIZE = 24  # World size of a sprite, walls are TILE_SIZE
+SPRITE_COLORS = [(220, 60, 60), (60, 160, 230), (230, 200, 60), (120, 220, 120)]
+NUM_SPRITES = 0  # Sprites scattered over every level
+SPRITES = []  # Sprites of the current level
+
+class Sprite:
+    def __init__(self, x, y, color, size=SPRITE_SIZE):
+        self.x = x
+        self.y = y
+        self.color = color
+        self.size = size
+
+# Scatter sprites over the floor of the current map (its first 64x64 tiles for huge mazes)
+def spawn_sprites(count, seed=0):
+    rng = random.Random(seed)
+    floor = [(x, y) for y in range(min(MAP_HEIGHT, 64)) for x in range(min(MAP_WIDTH, 64)) if not MAP.is_wall(x, y)]
+    sprites = []
+    for _ in range(count):
+        tile_x, tile_y = rng.choice(floor)
+        x = (tile_x + rng.uniform(0.25, 0.75)) * TILE_SIZE
+        y = (tile_y + rng.uniform(0.25, 0.75)) * TILE_SIZE
+        sprites.append(Sprite(x, y, rng.choice(SPRITE_COLORS)))
+    return sprites
+
+# Runs of columns in [first, last) where something at `depth` is in front of the wall
+def visible_runs(depth_buffer, first, last, depth):
+    if np is not None and isinstance(depth_buffer, np.ndarray):
+        visible = np.concatenate(([False], depth_buffer[first:last] > depth, [False]))
+        edges = np.flatnonzero(visible[1:] != visible[:-1]) + first
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+    runs = []
+    start = None
+    for column in range(first, last):
+        if depth_buffer[column] > depth:
+            if start is None:
+                start = column
+        elif start is not None:
+            runs.append((start, column))
+            start = None
+    if start is not None:
+        runs.append((start, last))
+    return runs
+
+def draw_sprites(player, sprites, depth_buffer, surface=None):
+    surface = surface or screen
+    view_width, view_height = surface.get_size()
+    num_rays = len(depth_buffer)
+    scale = view_width // num_rays
+    ray_angle = FOV / num_rays
+
+    visible = []
+    for sprite in sprites:
+        dx = sprite.x - player.x
+        dy = sprite.y - player.y
+        distance = math.hypot(dx, dy)
+        if distance < 1:
+            continue
+        angle = (math.atan2(dy, dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        half_width = math.atan2(sprite.size / 2, distance)
+        if abs(angle) - half_width > FOV / 2:
+            continue  # Outside the field of view
+        depth = distance * math.cos(angle)  # Same fish-eye correction as the walls
+        if depth < 1:
+            continue  # Beside or behind the player
+        visible.append((depth, angle, half_width, sprite))
+
+    visible.sort(key=lambda item: item[0], reverse=True)
+    for depth, angle, half_width, sprite in visible:
+        first = max(0, int((angle - half_width + FOV / 2) / ray_angle))
+        last = min(num_rays, int((angle + half_width + FOV / 2) / ray_angle) + 1)
+        runs = visible_runs(depth_buffer, first, last, depth)
+        if not runs:
+            continue  # Hidden behind walls
+
+        # Stand on the floor: the bottom edge of a wall at the same distance
+        elevation = 1 - (player.z / 100)
+        height = sprite.size * view_height / depth * elevation
+        floor_y = view_height // 2 + TILE_SIZE * view_height / depth * elevation / 2
+        floor_y += player.view_offset * view_height / SCREEN_HEIGHT
+        shade = 1 / (1 + depth * depth * 0.0001)
+        color = [int(channel * shade) for channel in sprite.color]
+        for start, stop in runs:
+            pygame.draw.rect(surface, color, (start * scale, floor_y - height, (stop - start) * scale, height))
+
+# Cast and draw the 3D view with the selected back-end into a surface,
+# splitting the casting into column bands when a BandCaster is given, then
+# draw the level's sprites against the resulting depth buffer. The view window
+# is looked up from the map unless given (see RenderPipeline).
+def render_view(player, renderer, num_rays=NUM_RAYS, surface=None, caster=None, window=None):
+    depth_buffer = cast_and_draw(player, renderer, num_rays, surface, caster, window)
+    if SPRITES:
+        draw_sprites(player, SPRITES, depth_buffer, surface)
+    return depth_buffer
+
+def cast_and_draw(player, renderer, num_rays, surface, caster, window=None):
+    if caster is not None and caster.mode == "process":
+        window = window or view_window(player.x, player.y)
+        depths = caster.cast_shared(
+            window,
+            player.x - window.x0 * TILE_SIZE,
+            player.y - window.y0 * TILE_SIZE,
+            player.angle - FOV / 2,
+            FOV / num_rays,
+            num_rays,
+            TILE_SIZE,
+            MAX_DEPTH,
+        )
+        if renderer == "python":
+            depth_buffer = []
+            draw_3d(ray_columns(player, depths, surface, depth_buffer), surface)
+            return depth_buffer
+        angles = player.angle - FOV / 2 + np.arange(num_rays) * (FOV / num_rays)
+        return draw_3d_numpy(player, angles, np.array(depths), surface)
+    elif caster is not None and renderer == "python":
+        window = window or view_window(player.x, player.y)
+        start_angle = player.angle - FOV / 2
+        depths = [math.inf] * num_rays
+
+        def cast_band(start, stop):
+            for ray in range(start, stop):
+                hit = cast_ray(player.x, player.y, start_angle + ray * (FOV / num_rays), window)
+                if hit:
+                    depths[ray] = hit[0]
+
+        caster.cast_threads(cast_band, num_rays)
+        depth_buffer = []
+        draw_3d(ray_columns(player, depths, surface, depth_buffer), surface)
+        return depth_buffer
+    elif caster is not None:
+        window = window or view_window(player.x, player.y)
+        angles = player.angle - FOV / 2 + np.arange(num_rays) * (FOV / num_rays)
+        depth = np.empty(num_rays)
+
+        def cast_band(start, stop):
+            depth[start:stop] = dda_numpy(player.x, player.y, angles[start:stop], window)[0]
+
+        wall_grid(window)  # Build the shared NumPy grid once, before the workers start
+        caster.cast_threads(cast_band, num_rays)
+        return draw_3d_numpy(player, angles, depth, surface)
+    elif renderer == "numpy":
+        angles, depth, _, _ = cast_rays_numpy(player, num_rays, window)
+        return draw_3d_numpy(player, angles, depth, surface)
+    elif renderer == "baked":
+        angles, depth = cast_rays_baked(player, num_rays)
+        return draw_3d_numpy(player, angles, depth, surface)
+    else:
+        depth_buffer = []
+        rays = cast_rays(player, num_rays, surface, depth_buffer, window)
+        draw_3d(rays, surface)
+        return depth_buffer
+
+# Dynamic resolution: watches the frame time every tick and lowers or raises
+# the number of cast columns to stay within the frame budget. Below full
+# resolution the walls are drawn into an offscreen surface one pixel per column
+# (and, with scale_height, proportionally fewer rows) that is scaled up to the
+# screen.
+class ResolutionController:
+    def __init__(self, target_fps=60, min_rays=SCREEN_WIDTH // 8, scale_height=False):
+        self.budget_ms = 1000 / target_fps
+        self.min_rays = min_rays
+        self.max_rays = NUM_RAYS
+        self.num_rays = NUM_RAYS
+        self.scale_height = scale_height
+        self.frame_ms = 0.0  # Smoothed time spent working on a frame
+        self.frames = 0
+        self.degraded_frames = 0  # Frames rendered below full resolution
+        self.changes = 0
+        self.cooldown = 0
+        self.surfaces = {}
+
+    def update(self, frame_ms):
+        self.frame_ms = frame_ms if self.frames == 0 else self.frame_ms * 0.9 + frame_ms * 0.1
+        self.frames += 1
+        if self.num_rays < self.max_rays:
+            self.degraded_frames += 1
+
+        # Let the average settle after every change before reacting again
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        if self.frame_ms > self.budget_ms * 0.9 and self.num_rays > self.min_rays:
+            self.num_rays = max(self.min_rays, int(self.num_rays * 0.8))
+        elif self.frame_ms < self.budget_ms * 0.6 and self.num_rays < self.max_rays:
+            self.num_rays = min(self.max_rays, int(self.num_rays * 1.1) + 1)
+        else:
+            return
+        self.changes += 1
+        self.cooldown = 15
+        print(f"Resolution: {self.resolution[0]}x{self.resolution[1]} (frame time {self.frame_ms:.1f} ms)")
+
+    @property
+    def resolution(self):
+        if self.scale_height:
+            return self.num_rays, max(1, SCREEN_HEIGHT * self.num_rays // SCREEN_WIDTH)
+        return self.num_rays, SCREEN_HEIGHT
+
+    # Surface the 3D view is drawn into, the screen itself at full resolution
+    def surface(self):
+        if self.resolution == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            return screen
+        surface = self.surfaces.get(self.resolution)
+        if surface is None:
+            surface = pygame.Surface(self.resolution).convert()
+            self.surfaces[self.resolution] = surface
+        surface.fill(BLACK)
+        return surface
+
+    def summary(self):
+        degraded = 100 * self.degraded_frames / max(1, self.frames)
+        return f"Adaptive resolution: {self.changes} changes, {degraded:.1f}% of {self.frames} frames below full resolution"
+
+# Pipelined rendering: a worker thread casts and rasterizes the 3D view of
+# frame N from a PlayerState snapshot while the main thread handles input and
+# simulates frame N + 1. Views are drawn into two alternating offscreen
+# surfaces, so the main thread can show one while the worker fills the other.
+# The map is only read on the main thread: the tiles around the player are
+# copied into the job with the snapshot, since a generated maze caches its
+# chunks as the player moves.
+class RenderPipeline:
+    def __init__(self, renderer, caster=None):
+        self.renderer = renderer
+        self.caster = caster
+        self.jobs = queue.Queue(maxsize=1)
+        self.results = queue.Queue(maxsize=1)
+        self.surfaces = {}
+        self.parity = 0
+        self.pending = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            state, window, num_rays, surface = job
+            try:
+                surface.fill(BLACK)
+                render_view(state, self.renderer, num_rays, surface, self.caster, window)
+                self.results.put(surface)
+            except Exception as error:  # Handed to the main thread, which raises it
+                self.results.put(error)
+
+    # Start rendering a frame in the background
+    def submit(self, state, num_rays, size):
+        self.parity ^= 1
+        surface = self.surfaces.get((size, self.parity))
+        if surface is None:
+            surface = pygame.Surface(size).convert()
+            self.surfaces[(size, self.parity)] = surface
+        self.jobs.put((state, view_window(state.x, state.y), num_rays, surface))
+        self.pending = True
+
+    # Wait for the frame being rendered and return its surface (None if idle)
+    def wait(self):
+        if not self.pending:
+            return None
+        self.pending = False
+        result = self.results.get()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        self.wait()
+        self.jobs.put(None)
+        self.thread.join()
+
+# Retained UI layer: the minimap is rendered once per level into a cached
+# surface, the legend once at startup and the timer only when its text changes.
+# Maps wider or taller than MINIMAP_TILES get a minimap window around the
+# player instead, re-rendered only when the player enters another tile.
+MINIMAP_TILES = 24
+MINIMAP_TILE_SIZE = 4
+ui_font = pygame.font.Font(None, 36)
+_minimap = {"key": None, "surface": None}
+_ui_text = {}
+
+def render_minimap(x0, y0, width, height, mini_tile_size):
+    surface = pygame.Surface((math.ceil(width * mini_tile_size), math.ceil(height * mini_tile_size))).convert()
+    surface.fill(BLACK)
+
+    cells = MAP.window(x0, y0, width, height)
+    for y in range(height):
+        for x in range(width):
+            if cells[y * width + x] == levelpack.WALL:
+                rect = pygame.Rect(
+                    x * mini_tile_size,
+                    y * mini_tile_size,
+                    mini_tile_size,
+                    mini_tile_size,
+                )
+                pygame.draw.rect(surface, GRAY, rect)
 
     # Draw player starting position (red)
-    start_pos = LEVELS[current_level]["start"]
+    start_pos = MAP.start
     pygame.draw.rect(
-        screen,
+        surface,
         RED,
         (
-            start_pos[0] * mini_tile_size,
-            start_pos[1] * mini_tile_size,
+            (start_pos[0] - x0) * mini_tile_size,
+            (start_pos[1] - y0) * mini_tile_size,
             mini_tile_size,
             mini_tile_size,
         ),
     )
 
     # Draw goal position (green)
-    goal_pos = LEVELS[current_level]["goal"]
+    goal_pos = MAP.goal
     pygame.draw.rect(
-        screen,
+        surface,
         GREEN,
         (
-            goal_pos[0] * mini_tile_size,
-            goal_pos[1] * mini_tile_size,
+            (goal_pos[0] - x0) * mini_tile_size,
+            (goal_pos[1] - y0) * mini_tile_size,
             mini_tile_size,
             mini_tile_size,
         ),
     )
+    return surface
+
+# Draw top-down map
+def draw_top_down(player):
+    if MAP_WIDTH <= MINIMAP_TILES and MAP_HEIGHT <= MINIMAP_TILES:
+        key = (id(MAP), 0, 0)
+        if _minimap["key"] != key:
+            mini_map_scale = 40 / (MAP_WIDTH * TILE_SIZE)  # Fit the map within 40px width
+            _minimap["key"] = key
+            _minimap["surface"] = render_minimap(0, 0, MAP_WIDTH, MAP_HEIGHT, TILE_SIZE * mini_map_scale)
+        screen.blit(_minimap["surface"], (0, 0))
+        return
+
+    x0 = int(player.x // TILE_SIZE) - MINIMAP_TILES // 2
+    y0 = int(player.y // TILE_SIZE) - MINIMAP_TILES // 2
+    key = (id(MAP), x0, y0)
+    if _minimap["key"] != key:
+        _minimap["key"] = key
+        _minimap["surface"] = render_minimap(x0, y0, MINIMAP_TILES, MINIMAP_TILES, MINIMAP_TILE_SIZE)
+    screen.blit(_minimap["surface"], (0, 0))
+
+    # Draw the player (white)
+    scale = MINIMAP_TILE_SIZE / TILE_SIZE
+    pygame.draw.circle(screen, WHITE, ((player.x - x0 * TILE_SIZE) * scale, (player.y - y0 * TILE_SIZE) * scale), 2)
+
+# Render a line of UI text, reusing the previous surface while the text is unchanged
+def ui_text(slot, text, color=WHITE):
+    cached = _ui_text.get(slot)
+    if cached is None or cached[0] != (text, color):
+        cached = ((text, color), ui_font.render(text, True, color))
+        _ui_text[slot] = cached
+    return cached[1]
 
 # Draw timer and legend
 def draw_ui(timer, message=None):
     # Draw timer
-    font = pygame.font.Font(None, 36)
-    timer_text = font.render(f"Time: {timer:.2f}s", True, WHITE)
+    timer_text = ui_text("timer", f"Time: {timer:.2f}s")
     timer_rect = pygame.Rect((SCREEN_WIDTH - 100) // 2, 10, 100, 60)
     pygame.draw.rect(screen, BLACK, timer_rect)
     screen.blit(timer_text, (timer_rect.x + 10, timer_rect.y + 10))
 
     # Draw message if any
     if message:
-        message_text = font.render(message, True, GREEN if message == "GOAL" else RED)
+        message_text = ui_text("message", message, GREEN if message == "GOAL" else RED)
         screen.blit(message_text, (SCREEN_WIDTH // 2 - message_text.get_width() // 2, SCREEN_HEIGHT // 2))
 
     # Draw legend
@@ -188,21 +796,36 @@ def draw_ui(timer, message=None):
         "PRESS ESC TO QUIT",
     ]
     for i, text in enumerate(legend_text):
-        legend_rendered = font.render(text, True, WHITE)
+        legend_rendered = ui_text(("legend", i), text)
         screen.blit(legend_rendered, (10, SCREEN_HEIGHT - 40 * (len(legend_text) - i)))
 
-# Main function
-def main():
-    global current_level, MAP, MAP_WIDTH, MAP_HEIGHT
+# Switch to a level and return a player standing on its start tile
+def load_level(index, renderer="python"):
+    global LEVEL_GRIDS, current_level, MAP, MAP_WIDTH, MAP_HEIGHT, SPRITES
+
+    if LEVEL_GRIDS is None:
+        LEVEL_GRIDS = levelpack.open_levels(LEVELS)
+    current_level = index
+    MAP = LEVEL_GRIDS[current_level]
+    MAP_WIDTH = MAP.width
+    MAP_HEIGHT = MAP.height
+    if renderer == "baked":
+        baked_table()  # Load or bake the level's ray table on entry, not mid-frame
+    SPRITES = spawn_sprites(NUM_SPRITES, seed=index)
+    player_start = MAP.start
+    return Player(player_start[0] * TILE_SIZE + TILE_SIZE // 2, player_start[1] * TILE_SIZE + TILE_SIZE // 2, 0)
 
+# Main function
+def main(renderer="python", resolution=None, caster=None, pipelined=False):
+    init_display()
+    pipeline = RenderPipeline(renderer, caster) if pipelined else None
     clock = pygame.time.Clock()
     start_time = pygame.time.get_ticks()
     timer = 0
     message = None
     message_time = None
 
-    player_start = LEVELS[current_level]["start"]
-    player = Player(player_start[0] * TILE_SIZE + TILE_SIZE // 2, player_start[1] * TILE_SIZE + TILE_SIZE // 2, 0)
+    player = load_level(current_level, renderer)
 
     # Enable mouse input
     pygame.mouse.set_visible(False)  # Hide mouse cursor
@@ -217,12 +840,9 @@ def main():
                 running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                 # Restart the game
-                current_level = 0
-                MAP = LEVELS[current_level]["map"]
-                MAP_WIDTH = len(MAP[0])
-                MAP_HEIGHT = len(MAP)
-                player_start = LEVELS[current_level]["start"]
-                player = Player(player_start[0] * TILE_SIZE + TILE_SIZE // 2, player_start[1] * TILE_SIZE + TILE_SIZE // 2, 0)
+                if pipeline is not None:
+                    pipeline.wait()  # Drop the frame being rendered from the old level
+                player = load_level(0, renderer)
                 start_time = pygame.time.get_ticks()
 
         # Update timer
@@ -234,15 +854,12 @@ def main():
         player.rotate_with_mouse()
 
         # Check if player reaches the goal
-        goal_pos = LEVELS[current_level]["goal"]
+        goal_pos = MAP.goal
         if int(player.x // TILE_SIZE) == goal_pos[0] and int(player.y // TILE_SIZE) == goal_pos[1]:
-            if current_level + 1 < len(LEVELS):
-                current_level += 1
-                MAP = LEVELS[current_level]["map"]
-                MAP_WIDTH = len(MAP[0])
-                MAP_HEIGHT = len(MAP)
-                player_start = LEVELS[current_level]["start"]
-                player = Player(player_start[0] * TILE_SIZE + TILE_SIZE // 2, player_start[1] * TILE_SIZE + TILE_SIZE // 2, 0)
+            if current_level + 1 < len(LEVEL_GRIDS):
+                if pipeline is not None:
+                    pipeline.wait()  # Drop the frame being rendered from the old level
+                player = load_level(current_level + 1, renderer)
                 start_time = pygame.time.get_ticks()
                 message = "GOAL"
                 message_time = pygame.time.get_ticks()
@@ -258,15 +875,113 @@ def main():
             message_time = None
 
         # Raycasting and rendering
-        rays = cast_rays(player)
-        draw_3d(rays)
-        draw_top_down()
+        if pipeline is not None:
+            if resolution is None:
+                num_rays, size = NUM_RAYS, (SCREEN_WIDTH, SCREEN_HEIGHT)
+            else:
+                num_rays, size = resolution.num_rays, resolution.resolution
+            view = pipeline.wait()  # Previous frame, rendered while this one was simulated
+            pipeline.submit(player.snapshot(), num_rays, size)
+            if view is not None and view.get_size() == (SCREEN_WIDTH, SCREEN_HEIGHT):
+                screen.blit(view, (0, 0))
+            elif view is not None:
+                pygame.transform.scale(view, (SCREEN_WIDTH, SCREEN_HEIGHT), screen)
+        elif resolution is None:
+            render_view(player, renderer, caster=caster)
+        else:
+            view = resolution.surface()
+            render_view(player, renderer, resolution.num_rays, view, caster)
+            if view is not screen:
+                pygame.transform.scale(view, (SCREEN_WIDTH, SCREEN_HEIGHT), screen)
+        draw_top_down(player)
         draw_ui(timer, message)
 
         pygame.display.flip()
         clock.tick(60)
-
+        if resolution is not None:
+            resolution.update(clock.get_rawtime())  # Time spent on the frame, without the tick delay
+
+    if pipeline is not None:
+        pipeline.close()
+    if resolution is not None:
+        print(resolution.summary())
+    if caster is not None:
+        print(caster.summary())
+        caster.close()
+    if isinstance(MAP, mazegen.ChunkedMaze):
+        print(f"Maze: {MAP.generated} chunks generated, {MAP.memory_usage() // 1024} KB of chunks cached")
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Doom-like Sandbox Game")
+    parser.add_argument(
+        "--renderer",
+        choices=["python", "numpy", "baked"],
+        default="numpy" if np is not None else "python",
+        help="ray casting back-end (default: numpy when available); baked, from precomputed tables in .bake/, "
+        "is slower than numpy on the bundled levels and kept for comparison",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="lower the number of cast columns when frames go over budget",
+    )
+    parser.add_argument(
+        "--adaptive-rows",
+        action="store_true",
+        help="with --adaptive, also render fewer rows and scale them up",
+    )
+    parser.add_argument(
+        "--maze",
+        type=int,
+        metavar="SIZE",
+        help=f"play a procedurally generated SIZE x SIZE tile maze instead of the levels (at least {mazegen.CHUNK}, rounded up to whole chunks)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the --maze generator")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="cast the screen in column bands on this many workers",
+    )
+    parser.add_argument(
+        "--parallel",
+        choices=["thread", "process"],
+        default="thread" if np is not None else "process",
+        help="worker pool for --workers: threads running the renderer's caster, or processes sharing memory",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="render each frame on a worker thread while the next one is simulated",
+    )
+    parser.add_argument(
+        "--sprites",
+        type=int,
+        default=NUM_SPRITES,
+        metavar="COUNT",
+        help="scatter COUNT billboard sprites over every level",
+    )
+    args = parser.parse_args()
+    NUM_SPRITES = args.sprites
+    if args.maze is not None:
+        if args.maze < mazegen.CHUNK:
+            parser.error(f"--maze needs at least {mazegen.CHUNK} tiles, a whole generator chunk")
+        LEVEL_GRIDS = [mazegen.ChunkedMaze(args.maze, args.maze, args.seed)]
+        if args.renderer == "baked":
+            print("Generated mazes cannot be baked, using the numpy renderer")
+            args.renderer = "numpy"
+    if args.renderer != "python" and np is None:
+        print("NumPy is not installed, falling back to the python renderer")
+        args.renderer = "python"
+
+    caster = None
+    if args.workers > 0:
+        if args.renderer == "baked":
+            print("The baked renderer does not cast in bands, ignoring --workers")
+        else:
+            view_cells = (2 * VIEW_RADIUS + 1) ** 2
+            caster = raybands.BandCaster(args.workers, args.parallel, NUM_RAYS, view_cells)
+
+    resolution = ResolutionController(scale_height=args.adaptive_rows) if args.adaptive else None
+    main(args.renderer, resolution, caster, args.pipeline)
@@ -0,0 +1,166 @@
+# levelpack.py
+#
+# Compiles the text levels from levels.py into a binary file that the games can
+# open without parsing: every map is stored as a byte grid (1 = wall, 0 = floor)
+# next to its start and goal tiles, and the file is memory-mapped when loaded.
+# levels.py stays the authoring source, run `py .\levelpack.py` to rebuild
+# (doom.py also rebuilds it on startup whenever levels.py has changed).
+#
+# File layout (little-endian):
+#   header:  magic "LVLP", format version (u16), level count (u16),
+#            SHA-1 of the source levels (20 bytes)
+#   index:   per level, grid offset (u32), width, height, start x, start y,
+#            goal x, goal y (u16 each)
+#   grids:   width * height bytes per level, row by row
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections import deque
+
+MAGIC = b"LVLP"
+VERSION = 1
+HEADER = struct.Struct("<4sHH20s")
+ENTRY = struct.Struct("<IHHHHHH")
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.bin")
+
+WALL = 1
+FLOOR = 0
+
+
+# A compiled map: a read-only byte grid plus the level metadata
+class LevelGrid:
+    def __init__(self, cells, width, height, start, goal):
+        self.cells = cells  # Flat bytes-like grid, cells[y * width + x]
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+
+    def is_wall(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x] == WALL
+        return True  # Everything outside the map is solid
+
+    def rows(self):
+        for y in range(self.height):
+            yield self.cells[y * self.width : (y + 1) * self.width]
+
+    # Copy a rectangle of tiles out of the map, tiles outside it are walls
+    def window(self, x0, y0, width, height):
+        out = bytearray([WALL]) * (width * height)
+        left, right = max(x0, 0), min(x0 + width, self.width)
+        for y in range(max(y0, 0), min(y0 + height, self.height)):
+            if left < right:
+                start = (y - y0) * width + left - x0
+                out[start : start + right - left] = self.cells[y * self.width + left : y * self.width + right]
+        return bytes(out)
+
+
+def source_hash(levels):
+    return hashlib.sha1(json.dumps(levels, sort_keys=True).encode()).digest()
+
+
+# Check that a level can be played: a rectangular map closed by walls, start
+# and goal on floor tiles inside it, and the goal reachable from the start
+def validate_level(level):
+    rows = level["map"]
+    if not rows or not rows[0]:
+        raise ValueError("map is empty")
+    width, height = len(rows[0]), len(rows)
+    for y, row in enumerate(rows):
+        if len(row) != width:
+            raise ValueError(f"row {y} is {len(row)} tiles wide, expected {width}")
+        unknown = set(row) - set("#.SG")
+        if unknown:
+            raise ValueError(f"row {y} has unknown tiles {''.join(sorted(unknown))!r}")
+    for x in range(width):
+        if rows[0][x] != "#" or rows[-1][x] != "#":
+            raise ValueError(f"map is not closed at column {x}")
+    for y in range(height):
+        if rows[y][0] != "#" or rows[y][-1] != "#":
+            raise ValueError(f"map is not closed at row {y}")
+
+    for name in ("start", "goal"):
+        x, y = level[name]
+        if not (0 <= x < width and 0 <= y < height):
+            raise ValueError(f"{name} {level[name]} is outside the map")
+        if rows[y][x] == "#":
+            raise ValueError(f"{name} {level[name]} is inside a wall")
+
+    # Breadth-first search from the start tile
+    seen = {tuple(level["start"])}
+    queue = deque(seen)
+    while queue:
+        x, y = queue.popleft()
+        if (x, y) == tuple(level["goal"]):
+            return
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if rows[ny][nx] != "#" and (nx, ny) not in seen:
+                seen.add((nx, ny))
+                queue.append((nx, ny))
+    raise ValueError(f"goal {level['goal']} cannot be reached from start {level['start']}")
+
+
+def compile_levels(levels, path=DEFAULT_PATH):
+    entries = []
+    grids = []
+    offset = HEADER.size + ENTRY.size * len(levels)
+    for index, level in enumerate(levels):
+        try:
+            validate_level(level)
+        except ValueError as error:
+            raise ValueError(f"level {index}: {error}") from None
+        rows = level["map"]
+        grid = bytes(WALL if char == "#" else FLOOR for row in rows for char in row)
+        entries.append(ENTRY.pack(offset, len(rows[0]), len(rows), *level["start"], *level["goal"]))
+        grids.append(grid)
+        offset += len(grid)
+
+    # Write to a temporary file first so a running game never maps a half-written file
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(levels), source_hash(levels)))
+        file.writelines(entries)
+        file.writelines(grids)
+    os.replace(temp_path, path)
+
+
+# Memory-map a compiled level file and return its LevelGrids
+def load_levels(path=DEFAULT_PATH):
+    with open(path, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} level file")
+
+    view = memoryview(data)
+    grids = []
+    for index in range(count):
+        offset, width, height, start_x, start_y, goal_x, goal_y = ENTRY.unpack_from(data, HEADER.size + ENTRY.size * index)
+        cells = view[offset : offset + width * height]
+        grids.append(LevelGrid(cells, width, height, (start_x, start_y), (goal_x, goal_y)))
+    return grids
+
+
+# Load the compiled levels, recompiling first when the file is missing, from an
+# older format or built from different source levels
+def open_levels(levels, path=DEFAULT_PATH):
+    try:
+        with open(path, "rb") as file:
+            magic, version, _, digest = HEADER.unpack(file.read(HEADER.size))
+        stale = magic != MAGIC or version != VERSION or digest != source_hash(levels)
+    except (OSError, struct.error):
+        stale = True
+    if stale:
+        compile_levels(levels, path)
+    return load_levels(path)
+
+
+if __name__ == "__main__":
+    from levels import LEVELS
+
+    compile_levels(LEVELS)
+    print(f"Compiled {len(LEVELS)} levels to {DEFAULT_PATH}")
@@ -0,0 +1,146 @@
+# mazegen.py
+#
+# Procedurally generated mazes of any size (thousands by thousands of tiles)
+# for doom.py. The maze is split into CHUNK x CHUNK tile chunks that are each
+# generated on demand from the maze seed and the chunk coordinates, so only the
+# chunks around the player ever exist in memory. Generated chunks are kept
+# bit-packed (one bit per tile) in a bounded cache, and the few chunks being
+# read right now are also kept unpacked (one byte per tile, like levelpack).
+#
+# Every chunk is a perfect maze of its own with cells on odd tile coordinates.
+# Its left and top border walls get one opening each, picked from the chunk's
+# own seed, which joins it to the chunk before it, so the whole maze is
+# connected without a chunk ever looking at its neighbours.
+
+import random
+from collections import OrderedDict
+
+from levelpack import FLOOR, WALL
+
+CHUNK = 64  # Tiles per chunk side, must be even
+PACKED_CACHE = 1024  # Bit-packed chunks kept in memory (512 bytes each)
+UNPACKED_CACHE = 16  # Unpacked chunks kept in memory (4 KB each)
+
+# Byte value -> the 8 tiles it packs, lowest bit first
+_UNPACK = [bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256)]
+
+
+def pack_bits(cells):
+    packed = bytearray(len(cells) // 8)
+    for index in range(len(packed)):
+        byte = 0
+        for bit, cell in enumerate(cells[index * 8 : index * 8 + 8]):
+            byte |= cell << bit
+        packed[index] = byte
+    return bytes(packed)
+
+
+def unpack_bits(packed):
+    return b"".join(_UNPACK[byte] for byte in packed)
+
+
+def generate_chunk(seed, chunk_x, chunk_y):
+    rng = random.Random(f"{seed}:{chunk_x}:{chunk_y}")
+    cells = bytearray([WALL]) * (CHUNK * CHUNK)
+    size = CHUNK // 2  # Maze cells per chunk side
+
+    # Iterative recursive backtracker over the chunk's cells
+    visited = bytearray(size * size)
+    visited[0] = 1
+    cells[CHUNK + 1] = FLOOR
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        options = [
+            (nx, ny)
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+            if 0 <= nx < size and 0 <= ny < size and not visited[ny * size + nx]
+        ]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        visited[ny * size + nx] = 1
+        cells[(2 * ny + 1) * CHUNK + 2 * nx + 1] = FLOOR
+        cells[(y + ny + 1) * CHUNK + x + nx + 1] = FLOOR  # The wall between the two cells
+        stack.append((nx, ny))
+
+    # Openings towards the previous chunks (the first row / column is the border wall)
+    if chunk_x > 0:
+        cells[(2 * rng.randrange(size) + 1) * CHUNK] = FLOOR
+    if chunk_y > 0:
+        cells[2 * rng.randrange(size) + 1] = FLOOR
+    return cells
+
+
+# A procedural maze with the same interface as levelpack.LevelGrid
+class ChunkedMaze:
+    def __init__(self, width, height, seed=0):
+        self.chunks_x = max(1, -(-(width - 1) // CHUNK))
+        self.chunks_y = max(1, -(-(height - 1) // CHUNK))
+        self.width = self.chunks_x * CHUNK + 1  # Plus the closing wall on the right
+        self.height = self.chunks_y * CHUNK + 1  # and at the bottom
+        self.seed = seed
+        self.start = (1, 1)
+        self.goal = (self.width - 2, self.height - 2)
+        self.packed = OrderedDict()
+        self.unpacked = OrderedDict()
+        self.generated = 0  # Chunks generated so far, including regenerated ones
+
+    def chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        cells = self.unpacked.get(key)
+        if cells is not None:
+            self.unpacked.move_to_end(key)
+            return cells
+
+        packed = self.packed.get(key)
+        if packed is None:
+            cells = bytes(generate_chunk(self.seed, chunk_x, chunk_y))
+            self.generated += 1
+            self.packed[key] = pack_bits(cells)
+            if len(self.packed) > PACKED_CACHE:
+                self.packed.popitem(last=False)
+        else:
+            self.packed.move_to_end(key)
+            cells = unpack_bits(packed)
+
+        self.unpacked[key] = cells
+        if len(self.unpacked) > UNPACKED_CACHE:
+            self.unpacked.popitem(last=False)
+        return cells
+
+    def is_wall(self, x, y):
+        if 0 <= x < self.width - 1 and 0 <= y < self.height - 1:
+            return self.chunk(x // CHUNK, y // CHUNK)[(y % CHUNK) * CHUNK + x % CHUNK] == WALL
+        return True
+
+    # Copy a rectangle of tiles out of the maze, tiles outside it are walls
+    def window(self, x0, y0, width, height):
+        out = bytearray()
+        inner_width = self.width - 1
+        for y in range(y0, y0 + height):
+            if not 0 <= y < self.height - 1:
+                out += bytes([WALL]) * width
+                continue
+            row = (y % CHUNK) * CHUNK
+            x = x0
+            while x < x0 + width:
+                if not 0 <= x < inner_width:
+                    # Run of tiles outside the maze, up to its edge or the window's
+                    end = min(x0 + width, 0) if x < 0 else x0 + width
+                    out += bytes([WALL]) * (end - x)
+                    x = end
+                    continue
+                end = min(x0 + width, (x // CHUNK + 1) * CHUNK, inner_width)
+                cells = self.chunk(x // CHUNK, y // CHUNK)
+                out += cells[row + x % CHUNK : row + x % CHUNK + end - x]
+                x = end
+        return bytes(out)
+
+    def rows(self):
+        for y in range(self.height):
+            yield self.window(0, y, self.width, 1)
+
+    def memory_usage(self):
+        return CHUNK * CHUNK // 8 * len(self.packed) + CHUNK * CHUNK * len(self.unpacked)
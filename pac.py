@@ -1,15 +1,20 @@
 import pygame
+import argparse
 import random
 import sys
-
-# Initialize Pygame
-pygame.init()
+import time
+from collections import OrderedDict
 
 # Screen settings
 WIDTH, HEIGHT = 448, 576  # Classic Pac-Man size
 TILE_SIZE = 32
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pac-Man Clone")
+screen = None  # Created by init_display(), the game logic runs without it
+
+def init_display():
+    global screen
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pac-Man Clone")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -18,8 +23,6 @@ BLUE = (0, 0, 255)
 WHITE = (255, 255, 255)
 RED = (255, 0, 0)
 
-# Clock
-clock = pygame.time.Clock()
 FPS = 60
 
 # Player settings
@@ -35,8 +38,9 @@ class Player:
         self.lives = 3
         self.score = 0
 
-    def draw(self):
-        pygame.draw.circle(screen, self.color, (self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2), TILE_SIZE // 2 - 2)
+    def draw(self, camera=(0, 0)):
+        center = (self.x - camera[0] + TILE_SIZE // 2, self.y - camera[1] + TILE_SIZE // 2)
+        pygame.draw.circle(screen, self.color, center, TILE_SIZE // 2 - 2)
 
     def move(self, maze):
         next_x, next_y = self.x, self.y
@@ -54,127 +58,466 @@ class Player:
             self.y = next_y
 
     def collides_with_walls(self, x, y, maze):
-        for wall in maze:
-            if wall.collidepoint(x + TILE_SIZE // 2, y + TILE_SIZE // 2):
-                return True
-        return False
+        return maze.wall_at(x + TILE_SIZE // 2, y + TILE_SIZE // 2)
 
 class Ghost:
-    def __init__(self, x, y, color):
+    def __init__(self, x, y, color, rng=random):
         self.x = x
         self.y = y
         self.color = color
-        self.direction = random.choice(["LEFT", "RIGHT", "UP", "DOWN"])
+        self.rng = rng
+        self.direction = rng.choice(["LEFT", "RIGHT", "UP", "DOWN"])
+        self.speed = player_speed // 2  # Must divide TILE_SIZE so ghosts land on tile corners
 
-    def draw(self):
-        pygame.draw.rect(screen, self.color, (self.x, self.y, TILE_SIZE, TILE_SIZE))
+    def draw(self, camera=(0, 0)):
+        pygame.draw.rect(screen, self.color, (self.x - camera[0], self.y - camera[1], TILE_SIZE, TILE_SIZE))
+
+    def move(self, maze, flow=None):
+        # On a tile, follow the flow field towards Pac-Man when he can be reached
+        if flow is not None and self.x % TILE_SIZE == 0 and self.y % TILE_SIZE == 0:
+            direction = flow.direction(self.x // TILE_SIZE, self.y // TILE_SIZE)
+            if direction is not None:
+                self.direction = direction
 
-    def move(self, maze):
         next_x, next_y = self.x, self.y
         if self.direction == "LEFT":
-            next_x -= player_speed // 2
+            next_x -= self.speed
         elif self.direction == "RIGHT":
-            next_x += player_speed // 2
+            next_x += self.speed
         elif self.direction == "UP":
-            next_y -= player_speed // 2
+            next_y -= self.speed
         elif self.direction == "DOWN":
-            next_y += player_speed // 2
+            next_y += self.speed
 
         if not self.collides_with_walls(next_x, next_y, maze):
             self.x = next_x
             self.y = next_y
         else:
-            self.direction = random.choice(["LEFT", "RIGHT", "UP", "DOWN"])
+            self.direction = self.rng.choice(["LEFT", "RIGHT", "UP", "DOWN"])
 
     def collides_with_walls(self, x, y, maze):
-        for wall in maze:
-            if wall.collidepoint(x + TILE_SIZE // 2, y + TILE_SIZE // 2):
-                return True
-        return False
-
-class Pellet:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.color = WHITE
+        return maze.wall_at(x + TILE_SIZE // 2, y + TILE_SIZE // 2)
+
+# Pellets are kept as a set of tiles, eating one is a lookup of the player's
+# tile. They are all drawn once into a layer Surface (on first use, headless
+# games never draw), eating one clears its tile there, and the layer is
+# blitted in one go every frame.
+class PelletStore:
+    def __init__(self, tiles):
+        self.tiles = set(tiles)
+        self.layer = None
+
+    def render_layer(self):
+        self.layer = pygame.Surface((WIDTH, HEIGHT))
+        self.layer.set_colorkey(BLACK)
+        for col, row in self.tiles:
+            pygame.draw.circle(self.layer, WHITE, (col * TILE_SIZE + TILE_SIZE // 2, row * TILE_SIZE + TILE_SIZE // 2), 4)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    # Eat the pellet on a tile, if there is one
+    def eat(self, col, row):
+        if (col, row) not in self.tiles:
+            return False
+        self.tiles.remove((col, row))
+        if self.layer is not None:
+            self.layer.fill(BLACK, (col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        return True
 
     def draw(self):
-        pygame.draw.circle(screen, self.color, (self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2), 4)
-
-# Create maze walls
-maze = []
-for y in range(0, HEIGHT, TILE_SIZE):
-    for x in range(0, WIDTH, TILE_SIZE):
-        if x == 0 or y == 0 or x == WIDTH - TILE_SIZE or y == HEIGHT - TILE_SIZE or (x % (TILE_SIZE * 4) == 0 and y % (TILE_SIZE * 3) == 0):
-            maze.append(pygame.Rect(x, y, TILE_SIZE, TILE_SIZE))
-
-# Create player, ghosts, and pellets
-player = Player(WIDTH // 2, HEIGHT - TILE_SIZE * 2)
-ghosts = [Ghost(TILE_SIZE, TILE_SIZE, RED), Ghost(WIDTH - TILE_SIZE * 2, TILE_SIZE, BLUE)]
-pellets = [Pellet(x, y) for x in range(TILE_SIZE, WIDTH - TILE_SIZE, TILE_SIZE) for y in range(TILE_SIZE, HEIGHT - TILE_SIZE, TILE_SIZE) if random.random() < 0.2]
-
-# Game Loop
-running = True
-while running:
-    screen.fill(BLACK)
-
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_LEFT:
-                player.direction = "LEFT"
-            elif event.key == pygame.K_RIGHT:
-                player.direction = "RIGHT"
-            elif event.key == pygame.K_UP:
-                player.direction = "UP"
-            elif event.key == pygame.K_DOWN:
-                player.direction = "DOWN"
-
-    # Update player and ghost positions
-    player.move(maze)
-    for ghost in ghosts:
-        ghost.move(maze)
-
-    # Check collisions with ghosts
-    for ghost in ghosts:
-        if abs(player.x - ghost.x) < TILE_SIZE and abs(player.y - ghost.y) < TILE_SIZE:
-            player.lives -= 1
-            player.x, player.y = WIDTH // 2, HEIGHT - TILE_SIZE * 2
-            if player.lives <= 0:
-                running = False
+        if self.layer is None:
+            self.render_layer()
+        screen.blit(self.layer, (0, 0))
+
+# Maze walls as a tile occupancy grid, so a wall test is one lookup whatever
+# the number of walls. The Rect list is derived from it for drawing only.
+class Maze:
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.cells = bytearray(cols * rows)  # 1 = wall, cells[row * cols + col]
+        for row in range(rows):
+            for col in range(cols):
+                if col == 0 or row == 0 or col == cols - 1 or row == rows - 1 or (col % 4 == 0 and row % 3 == 0):
+                    self.cells[row * cols + col] = 1
+        self.rects = None  # Wall rectangles, built on first use
+
+    # One rectangle per wall tile, for mazes drawn whole. The scrolling
+    # renderer draws from the cells and never builds them.
+    def wall_rects(self):
+        if self.rects is None:
+            self.rects = [
+                pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                for row in range(self.rows)
+                for col in range(self.cols)
+                if self.cells[row * self.cols + col]
+            ]
+        return self.rects
+
+    def is_wall(self, col, row):
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.cells[row * self.cols + col] == 1
+        return True  # Everything outside the maze is solid
+
+    # Is the pixel (x, y) inside a wall tile
+    def wall_at(self, x, y):
+        return self.is_wall(x // TILE_SIZE, y // TILE_SIZE)
+
+    # Pac-Man's start: the middle of the second row from the bottom, or the
+    # tile left of it when that is a pillar (pillars stand alone, so it is floor)
+    def start_tile(self):
+        col, row = self.cols // 2, self.rows - 2
+        if self.is_wall(col, row):
+            col -= 1
+        return col, row
+
+# Shared ghost pathfinding: a breadth-first search from Pac-Man's tile gives,
+# for every tile within FLOW_RADIUS steps of him, the direction of the next
+# step towards him (ghosts further away keep wandering). It is only recomputed
+# when he enters another tile, the last few fields are kept so going back and
+# forth between tiles costs nothing, and every ghost then steers with a single
+# lookup.
+FLOW_CACHE = 64  # Flow fields kept, by target tile
+FLOW_RADIUS = 40  # Steps searched from Pac-Man, bounds the search on big mazes
+
+class FlowField:
+    def __init__(self, maze):
+        self.maze = maze
+        self.cache = OrderedDict()
+        self.target = None
+        self.directions = None  # Direction per tile towards the target, None where unreachable
+        self.hits = 0
+        self.misses = 0
+        self.recompute_time = 0.0  # Total time spent in searches, in seconds
+
+    def update(self, col, row):
+        if (col, row) == self.target:
+            return
+        self.target = (col, row)
+        directions = self.cache.get(self.target)
+        if directions is not None:
+            self.cache.move_to_end(self.target)
+            self.hits += 1
+        else:
+            self.misses += 1
+            began = time.perf_counter()
+            directions = self.search(col, row, FLOW_RADIUS)
+            self.recompute_time += time.perf_counter() - began
+            self.cache[self.target] = directions
+            if len(self.cache) > FLOW_CACHE:
+                self.cache.popitem(last=False)
+        self.directions = directions
+
+    # Breadth-first search from a tile, up to radius steps away (the whole maze
+    # when None). Returns {tile index: direction towards the tile}.
+    def search(self, col, row, radius=None):
+        cols = self.maze.cols
+        cells = self.maze.cells
+        start = row * cols + col
+        directions = {start: "STOP"}
+        frontier = [start]
+        # Stepping from a tile to its neighbour at offset, and the direction
+        # that leads back from the neighbour
+        steps = ((-1, "RIGHT"), (1, "LEFT"), (-cols, "DOWN"), (cols, "UP"))
+        depth = 0
+        while frontier and (radius is None or depth < radius):
+            next_frontier = []
+            for index in frontier:
+                for offset, back in steps:
+                    neighbour = index + offset
+                    if neighbour not in directions and not cells[neighbour]:
+                        directions[neighbour] = back
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+            depth += 1
+        return directions
+
+    def direction(self, col, row):
+        if 0 <= col < self.maze.cols and 0 <= row < self.maze.rows:
+            return self.directions.get(row * self.maze.cols + col)
+        return None
+
+    def summary(self):
+        lookups = max(1, self.hits + self.misses)
+        searches = max(1, self.misses)
+        return (
+            f"Flow field: {self.hits + self.misses} target changes, {100 * self.hits / lookups:.1f}% cache hits, "
+            f"{1000 * self.recompute_time / searches:.3f} ms per search"
+        )
+
+# Draws the frame. When the maze fits the window, it is drawn once into a
+# background Surface, and each frame only the rectangles that changed (actors'
+# old and new tiles, eaten pellets, changed text) are restored from it,
+# redrawn and pushed to the display. full_redraw keeps the old way of
+# redrawing and flipping the whole window every frame, to compare the two.
+#
+# Bigger mazes scroll with a camera centred on Pac-Man. The whole window is
+# redrawn every frame, but only from the tiles in view: walls and pellets are
+# read from the tile grid and ghosts from the game's per-tile ghost index, so
+# the cost depends on the window size, not the maze size.
+class Renderer:
+    def __init__(self, game, full_redraw=False):
+        self.game = game
+        self.maze = game.maze
+        self.pellets = game.pellets
+        self.full_redraw = full_redraw
+        self.scrolling = self.maze.cols * TILE_SIZE > WIDTH or self.maze.rows * TILE_SIZE > HEIGHT
+        self.background = None
+        self.font = pygame.font.Font(None, 36)
+        self.text = {}  # Slot -> (text, rendered Surface, position)
+        self.previous = []  # Actor rectangles drawn last frame
+        self.invalid = []  # Rectangles to restore next frame
+        self.frames = 0
+        self.area = 0  # Total pixels pushed to the display
+        self.render_time = 0.0  # Total time spent drawing and updating, in seconds
+        if self.scrolling:
+            return
+
+        self.background = pygame.Surface((WIDTH, HEIGHT))
+        self.background.fill(BLACK)
+        for wall in self.maze.wall_rects():
+            pygame.draw.rect(self.background, BLUE, wall)
+        screen.blit(self.background, (0, 0))
+        self.pellets.draw()
+        pygame.display.flip()
+
+    # Restore a rectangle of the screen to the maze and pellets
+    def restore(self, rect):
+        screen.blit(self.background, rect, rect)
+        screen.blit(self.pellets.layer, rect, rect)
+
+    def invalidate_tile(self, col, row):
+        self.invalid.append(pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+
+    # Draw a line of text, re-rendering it only when it changed. Returns the
+    # rectangles to push when it did.
+    def draw_text(self, slot, text, position):
+        cached = self.text.get(slot)
+        dirty = []
+        if cached is None or cached[0] != text:
+            if cached is not None and self.background is not None:
+                old_rect = cached[1].get_rect(topleft=cached[2])
+                self.restore(old_rect)
+                dirty.append(old_rect)
+            cached = (text, self.font.render(text, True, WHITE), position)
+            self.text[slot] = cached
+            dirty.append(cached[1].get_rect(topleft=position))
+        screen.blit(cached[1], position)
+        return dirty
 
-    # Check collisions with pellets
-    for pellet in pellets[:]:
-        if abs(player.x - pellet.x) < TILE_SIZE // 2 and abs(player.y - pellet.y) < TILE_SIZE // 2:
-            pellets.remove(pellet)
+    def draw(self):
+        began = time.perf_counter()
+        player = self.game.player
+        ghosts = self.game.ghosts
+        if self.scrolling:
+            self.draw_viewport()
+            self.draw_text("score", f"Score: {player.score}", (10, 10))
+            self.draw_text("lives", f"Lives: {player.lives}", (WIDTH - 120, 10))
+            pygame.display.flip()
+            self.area += WIDTH * HEIGHT
+        elif self.full_redraw:
+            screen.fill(BLACK)
+            for wall in self.maze.wall_rects():
+                pygame.draw.rect(screen, BLUE, wall)
+            player.draw()
+            for ghost in ghosts:
+                ghost.draw()
+            self.pellets.draw()
+            self.text.clear()
+            self.draw_text("score", f"Score: {player.score}", (10, 10))
+            self.draw_text("lives", f"Lives: {player.lives}", (WIDTH - 120, 10))
+            pygame.display.flip()
+            self.area += WIDTH * HEIGHT
+        else:
+            dirty = self.previous + self.invalid
+            for rect in dirty:
+                self.restore(rect)
+            current = [pygame.Rect(actor.x, actor.y, TILE_SIZE, TILE_SIZE) for actor in [player] + ghosts]
+            player.draw()
+            for ghost in ghosts:
+                ghost.draw()
+            # Text is drawn over everything every frame, but only pushed when it
+            # changed or an actor moved under it
+            dirty += current
+            dirty += self.draw_text("score", f"Score: {player.score}", (10, 10))
+            dirty += self.draw_text("lives", f"Lives: {player.lives}", (WIDTH - 120, 10))
+            pygame.display.update(dirty)
+            for rect in dirty:
+                visible = rect.clip(screen.get_rect())
+                self.area += visible.width * visible.height
+            self.previous = current
+            self.invalid = []
+        self.frames += 1
+        self.render_time += time.perf_counter() - began
+
+    # Camera position: the top left pixel of the maze shown in the window
+    def camera(self):
+        player = self.game.player
+        x = player.x + TILE_SIZE // 2 - WIDTH // 2
+        y = player.y + TILE_SIZE // 2 - HEIGHT // 2
+        x = max(0, min(x, self.maze.cols * TILE_SIZE - WIDTH))
+        y = max(0, min(y, self.maze.rows * TILE_SIZE - HEIGHT))
+        return x, y
+
+    def draw_viewport(self):
+        camera_x, camera_y = self.camera()
+        maze = self.maze
+        pellets = self.pellets.tiles
+        first_col, first_row = camera_x // TILE_SIZE, camera_y // TILE_SIZE
+        last_col = min(maze.cols, (camera_x + WIDTH) // TILE_SIZE + 1)
+        last_row = min(maze.rows, (camera_y + HEIGHT) // TILE_SIZE + 1)
+
+        screen.fill(BLACK)
+        for row in range(first_row, last_row):
+            y = row * TILE_SIZE - camera_y
+            base = row * maze.cols
+            for col in range(first_col, last_col):
+                x = col * TILE_SIZE - camera_x
+                if maze.cells[base + col]:
+                    pygame.draw.rect(screen, BLUE, (x, y, TILE_SIZE, TILE_SIZE))
+                elif (col, row) in pellets:
+                    pygame.draw.circle(screen, WHITE, (x + TILE_SIZE // 2, y + TILE_SIZE // 2), 4)
+
+        # A ghost is indexed by the tile of its top left corner, so ghosts
+        # reaching into view from the tiles left of and above it count too
+        self.game.player.draw((camera_x, camera_y))
+        ghost_cells = self.game.ghost_cells
+        for row in range(first_row - 1, last_row):
+            for col in range(first_col - 1, last_col):
+                for ghost in ghost_cells.get((col, row), ()):
+                    ghost.draw((camera_x, camera_y))
+
+    def summary(self):
+        frames = max(1, self.frames)
+        if self.scrolling:
+            mode = "scrolling viewport"
+        else:
+            mode = "full redraw" if self.full_redraw else "dirty rectangles"
+        return (
+            f"Rendering ({mode}): {1000 * self.render_time / frames:.3f} ms per frame, "
+            f"{100 * self.area / frames / (WIDTH * HEIGHT):.1f}% of the window pushed per frame"
+        )
+
+# One game of Pac-Man without any drawing: the maze, the actors and the rules.
+# The window's game loop and the headless environments in pac_env.py both
+# drive it through update().
+class Game:
+    def __init__(self, maze, extra_ghosts=0, rng=random):
+        self.maze = maze
+        self.flow = FlowField(maze)
+        start_col, start_row = maze.start_tile()
+        self.start = (start_col * TILE_SIZE, start_row * TILE_SIZE)
+        self.player = Player(*self.start)
+        self.ghosts = [Ghost(TILE_SIZE, TILE_SIZE, RED, rng), Ghost((maze.cols - 2) * TILE_SIZE, TILE_SIZE, BLUE, rng)]
+        floor_tiles = [(col, row) for row in range(maze.rows) for col in range(maze.cols) if not maze.is_wall(col, row)]
+        for col, row in rng.sample(floor_tiles, min(extra_ghosts, len(floor_tiles))):
+            self.ghosts.append(Ghost(col * TILE_SIZE, row * TILE_SIZE, rng.choice([RED, BLUE]), rng))
+        self.pellets = PelletStore(
+            (col, row)
+            for col in range(1, maze.cols - 1)
+            for row in range(1, maze.rows - 1)
+            if not maze.is_wall(col, row) and rng.random() < 0.2
+        )
+        self.over = False
+
+        # Ghosts by the tile of their top left corner, for drawing only what is in view
+        self.ghost_cells = {}
+        for ghost in self.ghosts:
+            self.ghost_cells.setdefault((ghost.x // TILE_SIZE, ghost.y // TILE_SIZE), []).append(ghost)
+
+    def player_tile(self):
+        return ((self.player.x + TILE_SIZE // 2) // TILE_SIZE, (self.player.y + TILE_SIZE // 2) // TILE_SIZE)
+
+    # Advance the game by one frame. Returns the tile of the pellet eaten this
+    # frame, or None.
+    def update(self):
+        player = self.player
+
+        # Update player and ghost positions
+        player.move(self.maze)
+        player_tile = self.player_tile()
+        self.flow.update(*player_tile)
+        for ghost in self.ghosts:
+            cell = (ghost.x // TILE_SIZE, ghost.y // TILE_SIZE)
+            ghost.move(self.maze, self.flow)
+            new_cell = (ghost.x // TILE_SIZE, ghost.y // TILE_SIZE)
+            if new_cell != cell:
+                self.ghost_cells[cell].remove(ghost)
+                self.ghost_cells.setdefault(new_cell, []).append(ghost)
+
+        # Check collisions with ghosts
+        for ghost in self.ghosts:
+            if abs(player.x - ghost.x) < TILE_SIZE and abs(player.y - ghost.y) < TILE_SIZE:
+                player.lives -= 1
+                player.x, player.y = self.start
+                if player.lives <= 0:
+                    self.over = True
+
+        # Check collisions with pellets, where the player is now (back on the
+        # start tile if a ghost caught them)
+        player_tile = self.player_tile()
+        if self.pellets.eat(*player_tile):
             player.score += 10
+            return player_tile
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Pac-Man clone")
+    parser.add_argument("--ghosts", type=int, default=0, metavar="COUNT", help="add COUNT extra ghosts on random floor tiles")
+    parser.add_argument("--full-redraw", action="store_true", help="redraw and flip the whole window every frame (for comparison)")
+    parser.add_argument(
+        "--maze",
+        type=int,
+        nargs=2,
+        default=(WIDTH // TILE_SIZE, HEIGHT // TILE_SIZE),
+        metavar=("COLS", "ROWS"),
+        help="maze size in tiles, bigger mazes than the window scroll",
+    )
+    args = parser.parse_args()
+    if min(args.maze) < 3:
+        parser.error("--maze needs at least 3 x 3 tiles, a border around some floor")
+
+    init_display()
+    clock = pygame.time.Clock()
+
+    # Create maze, player, ghosts, and pellets
+    game = Game(Maze(*args.maze), extra_ghosts=args.ghosts)
+    renderer = Renderer(game, full_redraw=args.full_redraw)
+
+    # Game Loop
+    running = True
+    while running:
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    game.player.direction = "LEFT"
+                elif event.key == pygame.K_RIGHT:
+                    game.player.direction = "RIGHT"
+                elif event.key == pygame.K_UP:
+                    game.player.direction = "UP"
+                elif event.key == pygame.K_DOWN:
+                    game.player.direction = "DOWN"
+
+        eaten = game.update()
+        if eaten is not None:
+            renderer.invalidate_tile(*eaten)
+        if game.over:
+            running = False
 
-    # Draw maze, player, ghosts, and pellets
-    for wall in maze:
-        pygame.draw.rect(screen, BLUE, wall)
-
-    player.draw()
-
-    for ghost in ghosts:
-        ghost.draw()
-
-    for pellet in pellets:
-        pellet.draw()
-
-    # Display score and lives
-    font = pygame.font.Font(None, 36)
-    score_text = font.render(f"Score: {player.score}", True, WHITE)
-    lives_text = font.render(f"Lives: {player.lives}", True, WHITE)
-    screen.blit(score_text, (10, 10))
-    screen.blit(lives_text, (WIDTH - 120, 10))
+        # Draw player, ghosts, score and lives over the maze and pellets, and update the display
+        renderer.draw()
 
-    # Update display
-    pygame.display.flip()
+        # Cap the frame rate
+        clock.tick(FPS)
 
-    # Cap the frame rate
-    clock.tick(FPS)
+    print(game.flow.summary())
+    print(renderer.summary())
+    pygame.quit()
+    sys.exit()
 
-pygame.quit()
-sys.exit()
+if __name__ == "__main__":
+    main()
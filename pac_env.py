@@ -0,0 +1,248 @@
+# pac_env.py
+#
+# Headless Pac-Man environments for training bots against pac.py, no window
+# and no frame cap:
+#
+#   PacEnv       - one game, driving pac.Game itself (same classes and rules
+#                  as the windowed game)
+#   BatchPacEnv  - thousands of independent games stepped at once, with the
+#                  whole state in NumPy arrays (needs numpy)
+#
+# Both take a seed and replay exactly the same games for the same seed and
+# actions. Actions are indexes into ACTIONS, a step is one frame of the game
+# and the reward is the score gained in that frame.
+#
+# Run `py .\pac_env.py` to measure the throughput in environment steps per
+# second.
+
+import argparse
+import random
+import time
+
+import pac
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ACTIONS = ("STOP", "LEFT", "RIGHT", "UP", "DOWN")
+MAX_STEPS = 10000  # Frames before a game is cut short
+
+
+class PacEnv:
+    def __init__(self, seed=None, ghosts=0, max_steps=MAX_STEPS):
+        self.rng = random.Random(seed)
+        self.maze = pac.Maze(pac.WIDTH // pac.TILE_SIZE, pac.HEIGHT // pac.TILE_SIZE)
+        self.extra_ghosts = ghosts
+        self.max_steps = max_steps
+        self.game = None
+        self.steps = 0
+
+    def reset(self):
+        self.game = pac.Game(self.maze, self.extra_ghosts, self.rng)
+        self.steps = 0
+        return self.observation()
+
+    # The pellet set is the game's own, copy it to keep it past the next step
+    def observation(self):
+        player = self.game.player
+        return {
+            "player": (player.x, player.y),
+            "ghosts": [(ghost.x, ghost.y) for ghost in self.game.ghosts],
+            "pellets": self.game.pellets.tiles,
+            "lives": player.lives,
+            "score": player.score,
+        }
+
+    # Returns (observation, reward, done)
+    def step(self, action):
+        player = self.game.player
+        player.direction = ACTIONS[action]
+        score = player.score
+        self.game.update()
+        self.steps += 1
+        done = self.game.over or not self.game.pellets or self.steps >= self.max_steps
+        return self.observation(), player.score - score, done
+
+
+# Games in parallel, one row of every state array per game. They all share the
+# maze, and ghosts steer with a table of the first step from every tile
+# towards every other tile, built once from pac.FlowField's search, instead of
+# a flow field per game. Finished games are reset in the same step, so the
+# batch never has to wait for its slowest game.
+#
+# One difference with pac.Game: a player touched by several ghosts in the
+# same frame loses a single life.
+class BatchPacEnv:
+    def __init__(self, num_envs, seed=None, ghosts=0, max_steps=MAX_STEPS):
+        if np is None:
+            raise RuntimeError("BatchPacEnv needs numpy, run `pip install numpy`")
+        self.num_envs = num_envs
+        self.extra_ghosts = ghosts
+        self.num_ghosts = 2 + ghosts
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        maze = pac.Maze(pac.WIDTH // pac.TILE_SIZE, pac.HEIGHT // pac.TILE_SIZE)
+        self.cols = maze.cols
+        self.rows = maze.rows
+        self.walls = np.frombuffer(bytes(maze.cells), dtype=np.uint8).reshape(maze.rows, maze.cols).astype(bool)
+        start_col, start_row = maze.start_tile()
+        self.start = (start_col * pac.TILE_SIZE, start_row * pac.TILE_SIZE)
+        self.ghost_starts = [(pac.TILE_SIZE, pac.TILE_SIZE), ((maze.cols - 2) * pac.TILE_SIZE, pac.TILE_SIZE)]
+        self.floor = np.flatnonzero(~self.walls.ravel())  # Flat indexes of floor tiles
+        self.pellet_tiles = ~self.walls
+        self.pellet_tiles[[0, -1], :] = False
+        self.pellet_tiles[:, [0, -1]] = False
+
+        # next_step[from_tile, to_tile]: action to take on from_tile to get
+        # closer to to_tile, -1 when it cannot be reached
+        codes = {name: code for code, name in enumerate(ACTIONS)}
+        self.next_step = np.full((maze.cols * maze.rows, maze.cols * maze.rows), -1, dtype=np.int8)
+        flow = pac.FlowField(maze)
+        for target in self.floor:
+            for tile, direction in flow.search(target % maze.cols, target // maze.cols).items():
+                self.next_step[tile, target] = codes[direction]
+
+        self.dx = np.array([0, -1, 1, 0, 0], dtype=np.int32)
+        self.dy = np.array([0, 0, 0, -1, 1], dtype=np.int32)
+
+        n, g = num_envs, self.num_ghosts
+        self.player_x = np.zeros(n, dtype=np.int32)
+        self.player_y = np.zeros(n, dtype=np.int32)
+        self.player_direction = np.zeros(n, dtype=np.int8)
+        self.ghost_x = np.zeros((n, g), dtype=np.int32)
+        self.ghost_y = np.zeros((n, g), dtype=np.int32)
+        self.ghost_direction = np.zeros((n, g), dtype=np.int8)
+        self.pellets = np.zeros((n, maze.rows, maze.cols), dtype=bool)
+        self.pellets_left = np.zeros(n, dtype=np.int32)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.steps = np.zeros(n, dtype=np.int32)
+        self.index = np.arange(n)
+
+    def reset(self):
+        self.reset_games(self.index)
+        return self.observation()
+
+    def reset_games(self, games):
+        count = len(games)
+        if not count:
+            return
+        self.player_x[games], self.player_y[games] = self.start
+        self.player_direction[games] = 0
+        self.lives[games] = 3
+        self.score[games] = 0
+        self.steps[games] = 0
+
+        for ghost, (x, y) in enumerate(self.ghost_starts):
+            self.ghost_x[games, ghost] = x
+            self.ghost_y[games, ghost] = y
+        if self.extra_ghosts:
+            tiles = self.floor[self.rng.integers(0, len(self.floor), size=(count, self.extra_ghosts))]
+            self.ghost_x[games, 2:] = (tiles % self.cols) * pac.TILE_SIZE
+            self.ghost_y[games, 2:] = (tiles // self.cols) * pac.TILE_SIZE
+        self.ghost_direction[games] = self.rng.integers(1, len(ACTIONS), size=(count, self.num_ghosts))
+
+        self.pellets[games] = (self.rng.random((count, self.rows, self.cols)) < 0.2) & self.pellet_tiles
+        self.pellets_left[games] = self.pellets[games].sum(axis=(1, 2))
+
+    # The arrays are the environment's own, copy them to keep them past the next step
+    def observation(self):
+        return {
+            "player": np.stack((self.player_x, self.player_y), axis=1),
+            "ghosts": np.stack((self.ghost_x, self.ghost_y), axis=2),
+            "pellets": self.pellets,
+            "lives": self.lives,
+            "score": self.score,
+        }
+
+    def blocked(self, x, y):
+        return self.walls[(y + pac.TILE_SIZE // 2) // pac.TILE_SIZE, (x + pac.TILE_SIZE // 2) // pac.TILE_SIZE]
+
+    # Step every game with one action each. Returns (observation, reward,
+    # done), the observation of a finished game is already its next game's.
+    def step(self, actions):
+        tile = pac.TILE_SIZE
+
+        # Player
+        self.player_direction[:] = actions
+        next_x = self.player_x + self.dx[self.player_direction] * pac.player_speed
+        next_y = self.player_y + self.dy[self.player_direction] * pac.player_speed
+        free = ~self.blocked(next_x, next_y)
+        self.player_x[free] = next_x[free]
+        self.player_y[free] = next_y[free]
+        player_col = (self.player_x + tile // 2) // tile
+        player_row = (self.player_y + tile // 2) // tile
+
+        # Ghosts, steering on tile corners
+        aligned = (self.ghost_x % tile == 0) & (self.ghost_y % tile == 0)
+        ghost_tile = (self.ghost_y // tile) * self.cols + self.ghost_x // tile
+        step = self.next_step[ghost_tile, (player_row * self.cols + player_col)[:, None]]
+        steer = aligned & (step >= 0)
+        self.ghost_direction[steer] = step[steer]
+        speed = pac.player_speed // 2
+        next_x = self.ghost_x + self.dx[self.ghost_direction] * speed
+        next_y = self.ghost_y + self.dy[self.ghost_direction] * speed
+        blocked = self.blocked(next_x, next_y)
+        self.ghost_x = np.where(blocked, self.ghost_x, next_x)
+        self.ghost_y = np.where(blocked, self.ghost_y, next_y)
+        turns = int(blocked.sum())
+        if turns:
+            self.ghost_direction[blocked] = self.rng.integers(1, len(ACTIONS), size=turns)
+
+        # Ghost collisions
+        caught = (
+            (np.abs(self.player_x[:, None] - self.ghost_x) < tile) & (np.abs(self.player_y[:, None] - self.ghost_y) < tile)
+        ).any(axis=1)
+        self.lives -= caught
+        self.player_x[caught], self.player_y[caught] = self.start
+
+        # Pellets, where the player is now (back on the start tile if caught)
+        player_col = (self.player_x + tile // 2) // tile
+        player_row = (self.player_y + tile // 2) // tile
+        eaten = self.pellets[self.index, player_row, player_col]
+        self.pellets[self.index, player_row, player_col] = False
+        self.pellets_left -= eaten
+        reward = 10 * eaten.astype(np.int32)
+        self.score += reward
+
+        self.steps += 1
+        done = (self.lives <= 0) | (self.pellets_left == 0) | (self.steps >= self.max_steps)
+        self.reset_games(np.flatnonzero(done))
+        return self.observation(), reward, done
+
+
+def benchmark(args):
+    env = PacEnv(seed=args.seed, ghosts=args.ghosts)
+    env.reset()
+    rng = random.Random(args.seed)
+    began = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, done = env.step(rng.randrange(len(ACTIONS)))
+        if done:
+            env.reset()
+    print(f"PacEnv: {args.steps / (time.perf_counter() - began):,.0f} steps per second")
+
+    if np is None:
+        print("BatchPacEnv: needs numpy")
+        return
+    env = BatchPacEnv(args.envs, seed=args.seed, ghosts=args.ghosts)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    batches = max(1, args.steps // 10)
+    began = time.perf_counter()
+    for _ in range(batches):
+        env.step(rng.integers(0, len(ACTIONS), size=args.envs))
+    seconds = time.perf_counter() - began
+    print(f"BatchPacEnv ({args.envs} games): {batches * args.envs / seconds:,.0f} steps per second")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the headless Pac-Man environments")
+    parser.add_argument("--envs", type=int, default=4096, help="games in the batched environment")
+    parser.add_argument("--steps", type=int, default=20000, help="steps of the single environment (a tenth as many batches)")
+    parser.add_argument("--ghosts", type=int, default=0, help="extra ghosts per game")
+    parser.add_argument("--seed", type=int, default=0)
+    benchmark(parser.parse_args())
@@ -1,13 +1,14 @@
 import pygame
+import argparse
+import math
+import socket
+import struct
 import sys
-
-# Initialize pygame
-pygame.init()
+import time
+from collections import namedtuple
 
 # Screen dimensions
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pong")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -18,56 +19,106 @@ PADDLE_WIDTH, PADDLE_HEIGHT = 10, 100
 BALL_SIZE = 15
 
 # Paddle positions
-player1_x, player1_y = 10, (HEIGHT // 2 - PADDLE_HEIGHT // 2)
-player2_x, player2_y = WIDTH - 20, (HEIGHT // 2 - PADDLE_HEIGHT // 2)
-
-# Ball position and speed
-ball_x, ball_y = WIDTH // 2, HEIGHT // 2
-ball_dx, ball_dy = 4, 4
+PLAYER1_X = 10
+PLAYER2_X = WIDTH - 20
+PADDLE_START_Y = HEIGHT // 2 - PADDLE_HEIGHT // 2
 
 # Speeds
 paddle_speed = 5
+ball_speed = 4  # Pixels per tick along each axis
 
-# Scores
-player1_score = 0
-player2_score = 0
-
-# Fonts
-font = pygame.font.Font(None, 74)
-
-# Clock
-clock = pygame.time.Clock()
-
-# Game loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Handle key presses
-    keys = pygame.key.get_pressed()
-    if keys[pygame.K_w] and player1_y > 0:
-        player1_y -= paddle_speed
-    if keys[pygame.K_s] and player1_y < HEIGHT - PADDLE_HEIGHT:
-        player1_y += paddle_speed
-    if keys[pygame.K_UP] and player2_y > 0:
-        player2_y -= paddle_speed
-    if keys[pygame.K_DOWN] and player2_y < HEIGHT - PADDLE_HEIGHT:
-        player2_y += paddle_speed
-
-    # Update ball position
-    ball_x += ball_dx
-    ball_y += ball_dy
-
-    # Ball collision with top and bottom walls
-    if ball_y <= 0 or ball_y >= HEIGHT - BALL_SIZE:
-        ball_dy *= -1
-
-    # Ball collision with paddles
-    if (player1_x < ball_x < player1_x + PADDLE_WIDTH and player1_y < ball_y < player1_y + PADDLE_HEIGHT) or \
-       (player2_x < ball_x + BALL_SIZE < player2_x + PADDLE_WIDTH and player2_y < ball_y < player2_y + PADDLE_HEIGHT):
-        ball_dx *= -1
+# Move a paddle one tick up (direction -1), down (1) or not at all (0),
+# keeping it on screen
+def move_paddle(y, direction):
+    if direction < 0 and y > 0:
+        y -= paddle_speed
+    elif direction > 0 and y < HEIGHT - PADDLE_HEIGHT:
+        y += paddle_speed
+    return y
+
+MAX_BOUNCES = 8  # Bounces resolved within one step, a safety net for huge speeds
+
+# Continuous collision: the ball's box is swept along its velocity and the
+# time of impact with the walls and paddles found exactly, so it cannot pass
+# through a paddle however far it moves in one step.
+
+# Time (in ticks) at which a box at (x, y) moving by (dx, dy) per tick starts
+# touching a rectangle, and the axis it hits ("x" or "y"). None when it does
+# not hit it going forward, or already overlaps it.
+def sweep(x, y, w, h, dx, dy, rect_x, rect_y, rect_w, rect_h):
+    if dx > 0:
+        x_entry, x_exit = (rect_x - (x + w)) / dx, (rect_x + rect_w - x) / dx
+    elif dx < 0:
+        x_entry, x_exit = (rect_x + rect_w - x) / dx, (rect_x - (x + w)) / dx
+    elif x + w <= rect_x or x >= rect_x + rect_w:
+        return None
+    else:
+        x_entry, x_exit = -math.inf, math.inf
+
+    if dy > 0:
+        y_entry, y_exit = (rect_y - (y + h)) / dy, (rect_y + rect_h - y) / dy
+    elif dy < 0:
+        y_entry, y_exit = (rect_y + rect_h - y) / dy, (rect_y - (y + h)) / dy
+    elif y + h <= rect_y or y >= rect_y + rect_h:
+        return None
+    else:
+        y_entry, y_exit = -math.inf, math.inf
+
+    entry = max(x_entry, y_entry)
+    if entry < 0 or entry >= min(x_exit, y_exit):
+        return None
+    return entry, "x" if x_entry > y_entry else "y"
+
+# Move the ball for dt ticks, bouncing off the top and bottom walls and the
+# paddles (given as (x, y) of their top left corners) as many times as it hits
+# them on the way. Returns the new (x, y, dx, dy) and the number of bounces.
+def move_ball(x, y, dx, dy, dt, paddles):
+    remaining = dt
+    bounces = 0
+    while remaining > 0 and bounces < MAX_BOUNCES:
+        hit_time, axis = remaining, None
+        if dy < 0 and -y / dy < hit_time:
+            hit_time, axis = max(0.0, -y / dy), "y"
+        elif dy > 0 and (HEIGHT - BALL_SIZE - y) / dy < hit_time:
+            hit_time, axis = max(0.0, (HEIGHT - BALL_SIZE - y) / dy), "y"
+        for paddle_x, paddle_y in paddles:
+            hit = sweep(x, y, BALL_SIZE, BALL_SIZE, dx, dy, paddle_x, paddle_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+            if hit is not None and hit[0] < hit_time:
+                hit_time, axis = hit
+
+        x += dx * hit_time
+        y += dy * hit_time
+        remaining -= hit_time
+        if axis is None:
+            break
+        if axis == "x":
+            dx = -dx
+        else:
+            dy = -dy
+        bounces += 1
+    if remaining > 0:  # Out of bounces, finish the step in a straight line
+        x += dx * remaining
+        y += dy * remaining
+    return x, y, dx, dy, bounces
+
+# The whole game between two ticks. Scores are points won by each side.
+State = namedtuple("State", "player1_y player2_y ball_x ball_y ball_dx ball_dy player1_score player2_score")
+
+def new_state(ball_dx=ball_speed, ball_dy=ball_speed):
+    return State(PADDLE_START_Y, PADDLE_START_Y, WIDTH // 2, HEIGHT // 2, ball_dx, ball_dy, 0, 0)
+
+# The rules: one tick of the game from `state`, with the paddles moved by
+# move1 and move2 (see move_paddle). Pure, the next state is returned and
+# nothing else changes, so games can run anywhere at any pace.
+def step(state, move1, move2):
+    player1_y = move_paddle(state.player1_y, move1)
+    player2_y = move_paddle(state.player2_y, move2)
+    player1_score, player2_score = state.player1_score, state.player2_score
+
+    # Update ball position, bouncing off walls and paddles on the way
+    ball_x, ball_y, ball_dx, ball_dy, _ = move_ball(
+        state.ball_x, state.ball_y, state.ball_dx, state.ball_dy, 1, ((PLAYER1_X, player1_y), (PLAYER2_X, player2_y))
+    )
 
     # Ball out of bounds
     if ball_x <= 0:
@@ -79,12 +130,14 @@ while running:
         ball_x, ball_y = WIDTH // 2, HEIGHT // 2
         ball_dx *= -1
 
-    # Draw everything
+    return State(player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy, player1_score, player2_score)
+
+def draw_frame(screen, font, player1_y, player2_y, ball_x, ball_y, player1_score, player2_score):
     screen.fill(BLACK)
-    
+
     # Draw paddles and ball
-    pygame.draw.rect(screen, WHITE, (player1_x, player1_y, PADDLE_WIDTH, PADDLE_HEIGHT))
-    pygame.draw.rect(screen, WHITE, (player2_x, player2_y, PADDLE_WIDTH, PADDLE_HEIGHT))
+    pygame.draw.rect(screen, WHITE, (PLAYER1_X, player1_y, PADDLE_WIDTH, PADDLE_HEIGHT))
+    pygame.draw.rect(screen, WHITE, (PLAYER2_X, player2_y, PADDLE_WIDTH, PADDLE_HEIGHT))
     pygame.draw.ellipse(screen, WHITE, (ball_x, ball_y, BALL_SIZE, BALL_SIZE))
 
     # Draw center line
@@ -96,11 +149,136 @@ while running:
     screen.blit(player1_text, (WIDTH // 4, 20))
     screen.blit(player2_text, (WIDTH * 3 // 4, 20))
 
-    # Update display
-    pygame.display.flip()
+# Online play: one side of a match hosted by `pong_net.py serve`. Either set
+# of keys moves our paddle, see pong_net.py for how the lag is hidden.
+def play_online(screen, font, clock, address, match_id):
+    import pong_net  # Imports this module, so not at the top
+
+    host, port = address.rsplit(":", 1)
+    server = (host, int(port))
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    small_font = pygame.font.Font(None, 24)
+    client = None
+    refused = False  # The server turned our join down, stop asking
+    joined_at = -math.inf
+    bytes_in = bytes_out = 0
+    started = time.monotonic()
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        now = time.monotonic()
+        while True:
+            try:
+                data = sock.recv(2048)
+            except OSError:  # Nothing left, or the server is not there (yet)
+                break
+            bytes_in += len(data)
+            if not data:
+                continue
+            if data[0] == pong_net.WELCOME and client is None:
+                try:
+                    _, match_id, side, _ = pong_net.WELCOME_PACKET.unpack_from(data)
+                except struct.error:
+                    continue
+                client = pong_net.Client(side)
+                pygame.display.set_caption(f"Pong - match {match_id}, {('left', 'right')[side]} side")
+            elif data[0] == pong_net.SNAPSHOT and client is not None:
+                client.receive(data, now)
+            elif data[0] == pong_net.REFUSED and client is None:
+                refused = True
+
+        if client is None:
+            if not refused and now - joined_at > 0.5:
+                packet = pong_net.JOIN_PACKET.pack(pong_net.JOIN, match_id)
+                joined_at = now
+            else:
+                packet = None
+        else:
+            keys = pygame.key.get_pressed()
+            move = (keys[pygame.K_s] or keys[pygame.K_DOWN]) - (keys[pygame.K_w] or keys[pygame.K_UP])
+            packet = client.input_packet(move, now)
+        if packet is not None:
+            sock.sendto(packet, server)
+            bytes_out += len(packet)
+
+        view = client.view(now) if client is not None else None
+        if view is None:
+            screen.fill(BLACK)
+            if refused and match_id:
+                text = font.render(f"Match {match_id} is full or over", True, WHITE)
+            elif refused:
+                text = font.render("The server is full", True, WHITE)
+            else:
+                text = font.render("Connecting...", True, WHITE)
+            screen.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+        else:
+            (player1_y, player2_y), (ball_x, ball_y), (player1_score, player2_score) = view
+            draw_frame(screen, font, player1_y, player2_y, ball_x, ball_y, player1_score, player2_score)
+            seconds = max(1.0, now - started)
+            rtt = f"{client.rtts[-1]} ms" if client.rtts else "-"
+            status = f"RTT {rtt}   down {8 * bytes_in / seconds / 1000:.1f} kbit/s   up {8 * bytes_out / seconds / 1000:.1f} kbit/s"
+            screen.blit(small_font.render(status, True, WHITE), (10, HEIGHT - 24))
+        pygame.display.flip()
+        clock.tick(pong_net.TICK_RATE)
+
+    sock.sendto(bytes([pong_net.LEAVE]), server)
+    sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pong")
+    parser.add_argument("--ball-speed", type=float, default=ball_speed, help="ball speed in pixels per tick along each axis")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="play online on a pong_net.py server instead")
+    parser.add_argument("--match", type=int, default=0, help="match to join online, as shown in the other player's window (default: the next free side)")
+    args = parser.parse_args()
+
+    # Initialize pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pong")
+
+    # Paddles, ball and scores
+    state = new_state(args.ball_speed, args.ball_speed)
+
+    # Fonts
+    font = pygame.font.Font(None, 74)
+
+    # Clock
+    clock = pygame.time.Clock()
+
+    if args.connect:
+        play_online(screen, font, clock, args.connect, args.match)
+        pygame.quit()
+        sys.exit()
+
+    # Game loop
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        # Handle key presses
+        keys = pygame.key.get_pressed()
+        state = step(state, keys[pygame.K_s] - keys[pygame.K_w], keys[pygame.K_DOWN] - keys[pygame.K_UP])
+
+        # Draw everything
+        draw_frame(
+            screen, font, state.player1_y, state.player2_y, state.ball_x, state.ball_y, state.player1_score, state.player2_score
+        )
+
+        # Update display
+        pygame.display.flip()
+
+        # Frame rate
+        clock.tick(60)
 
-    # Frame rate
-    clock.tick(60)
+    pygame.quit()
+    sys.exit()
 
-pygame.quit()
-sys.exit()
+if __name__ == "__main__":
+    main()
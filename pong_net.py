@@ -0,0 +1,596 @@
+# pong_net.py
+#
+# Networked Pong over UDP:
+#
+#   serve  - an asyncio server running any number of matches at once. It is
+#            authoritative: clients only send their inputs, the server moves
+#            the paddles and the ball with pong.py's rules and sends the
+#            state back.
+#   bench  - starts a server in its own process and pairs of bot clients on
+#            localhost, and reports round-trip time, bandwidth per match and
+#            server CPU time for a growing number of matches
+#
+# Run `py .\pong_net.py serve`, then `py .\pong.py --connect 127.0.0.1:9999`
+# twice to play. --latency, --jitter and --loss make the server delay and
+# drop packets both ways, to try a bad network from one machine.
+#
+# Hiding the latency on the client (Client below): each input moves the
+# player's own paddle straight away (prediction) and is kept until the server
+# says it has applied it. Each snapshot puts the paddle back where the server
+# has it and replays the inputs the server has not applied yet
+# (reconciliation). The opponent and the ball are drawn INTERP_TICKS behind
+# the newest snapshot, in between the two snapshots around that tick
+# (interpolation), so they move smoothly whatever the jitter.
+#
+# Snapshots are delta compressed: each one only carries the fields that
+# changed since the last snapshot the client acknowledged. Input packets
+# repeat the inputs the server has not applied yet, so a lost packet costs
+# nothing but its own update.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import statistics
+import struct
+import time
+from collections import deque
+
+import pong
+
+TICK_RATE = 60  # Server ticks per second, one paddle step each like pong.py's frames
+SNAPSHOT_EVERY = 2  # Ticks between snapshots
+INTERP_TICKS = 6  # How far behind the newest snapshot the opponent and ball are drawn
+INPUT_REDUNDANCY = 8  # Unapplied inputs repeated in every input packet
+INPUT_BACKLOG = 4  # Queued inputs the server lets build up before skipping ahead
+HISTORY = 64  # Snapshots kept on both ends as delta bases
+TIMEOUT = 5.0  # Seconds of silence before the server drops a client
+MAX_MATCHES = 10000  # Matches a server hosts at most
+BALL_SCALE = 8  # Ball positions are sent in 1/8 pixels
+DEFAULT_PORT = 9999
+
+# Packet types, the first byte of every packet
+JOIN, WELCOME, INPUT, SNAPSHOT, STATS, LEAVE, REFUSED = range(1, 8)
+
+# Match (0: the first with a free side, otherwise a match the server gave
+# out to someone else, to play them)
+JOIN_PACKET = struct.Struct("<BI")
+WELCOME_PACKET = struct.Struct("<BIBB")  # match, side (0 left, 1 right), tick rate
+REFUSED_PACKET = struct.Struct("<BI")  # match asked for: full, unknown, or the server is full
+# Newest input sequence number, newest snapshot tick received, client time
+# (ms) and a count of moves (-1 up, 0, 1 down) that follow as signed bytes,
+# the last one being the newest
+INPUT_PACKET = struct.Struct("<BIIIB")
+# Tick, base tick (0: full snapshot), last input applied, echoed client time,
+# time the server held that input (ms) and the mask of the fields that follow
+SNAPSHOT_PACKET = struct.Struct("<BIIIIHB")
+
+# Snapshot fields in mask bit order: left paddle, right paddle, ball, scores.
+# A state is a tuple of one tuple per field.
+FIELDS = (struct.Struct("<h"), struct.Struct("<h"), struct.Struct("<hh"), struct.Struct("<HH"))
+
+
+def encode_snapshot(tick, base_tick, applied, client_time, hold, state, base):
+    mask = 0
+    body = []
+    for bit, (field, value) in enumerate(zip(FIELDS, state)):
+        if base is None or value != base[bit]:
+            mask |= 1 << bit
+            body.append(field.pack(*value))
+    return SNAPSHOT_PACKET.pack(SNAPSHOT, tick, base_tick, applied, client_time, hold, mask) + b"".join(body)
+
+
+# Returns (tick, applied, client_time, hold, state), or None when the base
+# snapshot is not in `history`
+def decode_snapshot(data, history):
+    _, tick, base_tick, applied, client_time, hold, mask = SNAPSHOT_PACKET.unpack_from(data)
+    base = history.get(base_tick) if base_tick else None
+    if base_tick and base is None:
+        return None
+    state = []
+    offset = SNAPSHOT_PACKET.size
+    for bit, field in enumerate(FIELDS):
+        if mask >> bit & 1:
+            state.append(field.unpack_from(data, offset))
+            offset += field.size
+        else:
+            state.append(base[bit])
+    return tick, applied, client_time, hold, tuple(state)
+
+
+# One match on the server. The ball waits in the middle until both sides
+# are taken.
+class Match:
+    def __init__(self, match_id):
+        self.id = match_id
+        self.players = [None, None]  # Client addresses by side
+        self.game = pong.new_state()
+        self.tick = 0
+        self.history = {}  # Snapshot states sent, by tick
+        self.pending = [{}, {}]  # Moves received but not applied, by sequence number
+        self.newest = [0, 0]  # Newest input sequence number received
+        self.applied = [0, 0]  # Last input sequence number applied
+        self.moves = [0, 0]  # Last move applied, repeated while no input is queued
+        self.acked = [0, 0]  # Newest snapshot tick each side has
+        self.client_time = [0, 0]  # Client time of the newest input, echoed for the RTT
+        self.received_at = [0.0, 0.0]
+
+    def full(self):
+        return None not in self.players
+
+    def empty(self):
+        return self.players == [None, None]
+
+    def seat(self, side, addr):
+        self.players[side] = addr
+        self.pending[side].clear()
+        self.newest[side] = self.applied[side] = self.moves[side] = self.acked[side] = 0
+        self.client_time[side] = 0
+
+    def receive(self, side, newest, acked, client_time, moves, now):
+        pending = self.pending[side]
+        for sequence, move in enumerate(moves, newest - len(moves) + 1):
+            if sequence > self.applied[side]:
+                pending[sequence] = move
+        if newest > self.newest[side]:
+            self.newest[side] = newest
+            self.client_time[side] = client_time
+            self.received_at[side] = now
+        self.acked[side] = max(self.acked[side], acked)
+
+    def step(self):
+        for side in (0, 1):
+            pending = self.pending[side]
+            if pending:
+                # The next input, or the first one after lost ones. A client
+                # too far ahead skips to its last few, and reconciles.
+                sequences = sorted(pending)
+                for sequence in sequences[:-INPUT_BACKLOG]:
+                    del pending[sequence]
+                sequence = sequences[max(0, len(sequences) - INPUT_BACKLOG)]
+                self.moves[side] = pending.pop(sequence)
+                self.applied[side] = sequence
+
+        self.tick += 1
+        game = self.game
+        if self.full():
+            self.game = pong.step(game, *self.moves)
+        else:
+            self.game = game._replace(
+                player1_y=pong.move_paddle(game.player1_y, self.moves[0]),
+                player2_y=pong.move_paddle(game.player2_y, self.moves[1]),
+            )
+
+    def state(self):
+        game = self.game
+        return (
+            (game.player1_y,),
+            (game.player2_y,),
+            (round(game.ball_x * BALL_SCALE), round(game.ball_y * BALL_SCALE)),
+            (game.player1_score, game.player2_score),
+        )
+
+    # Snapshot of the current tick for one side, against the newest one it has
+    def snapshot(self, side, now):
+        if self.tick not in self.history:
+            self.history[self.tick] = self.state()
+            self.history.pop(self.tick - HISTORY * SNAPSHOT_EVERY, None)
+        base_tick = self.acked[side]
+        base = self.history.get(base_tick)
+        if base is None:
+            base_tick = 0
+        hold = min(0xFFFF, int(1000 * (now - self.received_at[side])))
+        return encode_snapshot(
+            self.tick, base_tick, self.applied[side], self.client_time[side], hold, self.history[self.tick], base
+        )
+
+
+class Server(asyncio.DatagramProtocol):
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.latency = latency  # Seconds added to every packet, each way
+        self.jitter = jitter  # Up to this many seconds more, at random (packets get reordered)
+        self.loss = loss  # Fraction of the packets dropped, each way
+        self.rng = random.Random(seed)
+        self.transport = None
+        self.matches = {}
+        self.waiting = None  # Match with a free side for the next client that asks for any
+        self.next_match = 1
+        self.clients = {}  # Address -> (match, side)
+        self.last_seen = {}  # Address -> time of its last packet
+
+        self.ticks = 0
+        self.busy = 0.0  # Seconds spent ticking
+        self.overruns = 0  # Ticks that started late
+        self.bytes_in = 0  # Received and sent, not counting the packets dropped on purpose
+        self.bytes_out = 0
+        self.dropped = 0  # Packets dropped on purpose, both ways
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def delay(self):
+        return self.latency + self.jitter * self.rng.random()
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        if data[0] == STATS:  # Out of band, no injected trouble
+            self.transport.sendto(bytes([STATS]) + json.dumps(self.stats()).encode(), addr)
+            return
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        if self.latency or self.jitter:
+            asyncio.get_running_loop().call_later(self.delay(), self.handle, data, addr)
+        else:
+            self.handle(data, addr)
+
+    def send(self, data, addr):
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        self.bytes_out += len(data)
+        if self.latency or self.jitter:
+            asyncio.get_running_loop().call_later(self.delay(), self.transport.sendto, data, addr)
+        else:
+            self.transport.sendto(data, addr)
+
+    # Anyone can send us anything: packets too short for their type are dropped
+    def handle(self, data, addr):
+        now = asyncio.get_running_loop().time()
+        self.bytes_in += len(data)
+        kind = data[0]
+        try:
+            if kind == INPUT:
+                client = self.clients.get(addr)
+                if client is None:
+                    return
+                match, side = client
+                _, newest, acked, client_time, count = INPUT_PACKET.unpack_from(data)
+                moves = struct.unpack_from(f"<{count}b", data, INPUT_PACKET.size)
+                match.receive(side, newest, acked, client_time, moves, now)
+                self.last_seen[addr] = now
+            elif kind == JOIN:
+                self.join(addr, JOIN_PACKET.unpack_from(data)[1], now)
+            elif kind == LEAVE:
+                self.leave(addr)
+        except struct.error:
+            return
+
+    def new_match(self):
+        while self.next_match in self.matches:
+            self.next_match += 1
+        match = self.matches[self.next_match] = Match(self.next_match)
+        return match
+
+    def join(self, addr, match_id, now):
+        if addr in self.clients:  # Its welcome got lost
+            match, side = self.clients[addr]
+        else:
+            if match_id:
+                match = self.matches.get(match_id)
+            else:
+                if (self.waiting is None or self.waiting.full()) and len(self.matches) < MAX_MATCHES:
+                    self.waiting = self.new_match()
+                match = self.waiting
+            if match is None or match.full():
+                self.send(REFUSED_PACKET.pack(REFUSED, match_id), addr)
+                return
+            side = match.players.index(None)
+            match.seat(side, addr)
+            self.clients[addr] = (match, side)
+        self.last_seen[addr] = now
+        self.send(WELCOME_PACKET.pack(WELCOME, match.id, side, TICK_RATE), addr)
+
+    def leave(self, addr):
+        client = self.clients.pop(addr, None)
+        self.last_seen.pop(addr, None)
+        if client is None:
+            return
+        match, side = client
+        match.players[side] = None
+        if match.empty():
+            del self.matches[match.id]
+            if self.waiting is match:
+                self.waiting = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / TICK_RATE
+        next_tick = loop.time()
+        while True:
+            began = time.perf_counter()
+            now = loop.time()
+            if self.ticks % TICK_RATE == 0:
+                for addr in [addr for addr, seen in self.last_seen.items() if now - seen > TIMEOUT]:
+                    self.leave(addr)
+            for match in self.matches.values():
+                match.step()
+                if match.tick % SNAPSHOT_EVERY == 0:
+                    for side, addr in enumerate(match.players):
+                        if addr is not None:
+                            self.send(match.snapshot(side, now), addr)
+            self.ticks += 1
+            self.busy += time.perf_counter() - began
+
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def stats(self):
+        return {
+            "matches": len(self.matches),
+            "clients": len(self.clients),
+            "ticks": self.ticks,
+            "busy": self.busy,
+            "overruns": self.overruns,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "dropped": self.dropped,
+            "cpu": time.process_time(),
+            "wall": time.perf_counter(),
+        }
+
+
+# One player's end of a match, whatever carries its packets: builds the input
+# packets and turns the snapshots into what to draw. Times are in seconds of
+# time.monotonic (which the asyncio clock is too).
+class Client:
+    def __init__(self, side):
+        self.side = side
+        self.sequence = 0
+        self.inputs = []  # (sequence, move) sent but not applied by the server yet
+        self.paddle = pong.PADDLE_START_Y  # Own paddle, predicted
+        self.history = {}  # Decoded snapshot states by tick, the delta bases
+        self.snapshots = deque(maxlen=32)  # (tick, state) in tick order, for interpolation
+        self.latest = 0  # Newest snapshot tick
+        self.clock = None  # Server tick minus TICK_RATE times local time, smoothed
+        self.rtts = deque(maxlen=4096)  # Round trip times (ms)
+        self.corrections = 0  # Snapshots that moved the predicted paddle
+
+    def input_packet(self, move, now):
+        self.sequence += 1
+        self.inputs.append((self.sequence, move))
+        del self.inputs[:-2 * TICK_RATE]  # The server is not answering, stop piling up
+        self.paddle = pong.move_paddle(self.paddle, move)
+        moves = [move for _, move in self.inputs[-INPUT_REDUNDANCY:]]
+        return INPUT_PACKET.pack(
+            INPUT, self.sequence, self.latest, int(now * 1000) & 0xFFFFFFFF, len(moves)
+        ) + struct.pack(f"<{len(moves)}b", *moves)
+
+    def receive(self, data, now):
+        try:
+            decoded = decode_snapshot(data, self.history)
+        except struct.error:  # Truncated
+            return
+        if decoded is None:
+            return
+        tick, applied, client_time, hold, state = decoded
+        self.history[tick] = state
+        if len(self.history) > HISTORY:
+            del self.history[min(self.history)]
+        if tick <= self.latest:  # Arrived out of order
+            return
+        self.latest = tick
+        self.snapshots.append((tick, state))
+
+        if client_time:
+            self.rtts.append(((int(now * 1000) - client_time) & 0xFFFFFFFF) - hold)
+        offset = tick - now * TICK_RATE
+        self.clock = offset if self.clock is None else self.clock + 0.1 * (offset - self.clock)
+
+        # Reconciliation: from the server's paddle, replay what it has not applied yet
+        self.inputs = [(sequence, move) for sequence, move in self.inputs if sequence > applied]
+        paddle = state[self.side][0]
+        for _, move in self.inputs:
+            paddle = pong.move_paddle(paddle, move)
+        if paddle != self.paddle:
+            self.corrections += 1
+        self.paddle = paddle
+
+    # ([left paddle y, right paddle y], (ball x, ball y), scores) to draw at
+    # `now`, or None before the first snapshot
+    def view(self, now):
+        if not self.snapshots:
+            return None
+        render_tick = now * TICK_RATE + self.clock - INTERP_TICKS
+        older = newer = self.snapshots[0]
+        for snapshot in self.snapshots:
+            newer = snapshot
+            if snapshot[0] > render_tick:
+                break
+            older = snapshot
+        (older_tick, older_state), (newer_tick, newer_state) = older, newer
+        t = 0.0
+        if newer_tick > older_tick and older_state[3] == newer_state[3]:  # No lerping across a goal
+            t = min(1.0, max(0.0, (render_tick - older_tick) / (newer_tick - older_tick)))
+
+        def lerp(field, index):
+            a, b = older_state[field][index], newer_state[field][index]
+            return a + (b - a) * t
+
+        paddles = [lerp(0, 0), lerp(1, 0)]
+        paddles[self.side] = self.paddle
+        ball = (lerp(2, 0) / BALL_SCALE, lerp(2, 1) / BALL_SCALE)
+        return paddles, ball, older_state[3]
+
+
+def serve(host, port, latency=0.0, jitter=0.0, loss=0.0, seed=None, ready=None):
+    async def run():
+        loop = asyncio.get_running_loop()
+        server = Server(latency, jitter, loss, seed)
+        transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=(host, port))
+        port_used = transport.get_extra_info("sockname")[1]
+        if ready is None:
+            print(f"Serving Pong on {host}:{port_used}")
+        else:
+            ready.put(port_used)
+        await server.run()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+# Bench client: follows the ball with its own paddle
+class Bot(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.client = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        if data[0] == WELCOME and self.client is None:
+            try:
+                self.client = Client(WELCOME_PACKET.unpack_from(data)[2])
+            except struct.error:
+                return
+        elif data[0] == SNAPSHOT and self.client is not None:
+            self.client.receive(data, time.monotonic())
+
+    def step(self, now):
+        if self.client is None:
+            self.transport.sendto(JOIN_PACKET.pack(JOIN, 0))
+            return
+        move = 0
+        view = self.client.view(now)
+        if view is not None:
+            target = view[1][1] + pong.BALL_SIZE / 2 - pong.PADDLE_HEIGHT / 2
+            if abs(target - self.client.paddle) > pong.paddle_speed:
+                move = 1 if target > self.client.paddle else -1
+        self.transport.sendto(self.client.input_packet(move, now))
+
+
+class StatsRequest(asyncio.DatagramProtocol):
+    def __init__(self, reply):
+        self.reply = reply
+
+    def datagram_received(self, data, addr):
+        if data[:1] == bytes([STATS]) and not self.reply.done():
+            self.reply.set_result(json.loads(data[1:]))
+
+
+async def server_stats(address):
+    loop = asyncio.get_running_loop()
+    reply = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: StatsRequest(reply), remote_addr=address)
+    try:
+        transport.sendto(bytes([STATS]))
+        return await asyncio.wait_for(reply, 2.0)
+    finally:
+        transport.close()
+
+
+# One bench run: a fresh server process and 2 bots per match, all clients
+# stepping at TICK_RATE. The server's CPU time is measured in its own
+# process, so the bots do not count against it.
+async def bench_matches(matches, args):
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve,
+        args=("127.0.0.1", 0, args.latency / 1000, args.jitter / 1000, args.loss, args.seed, ready),
+        daemon=True,
+    )
+    process.start()
+    address = ("127.0.0.1", ready.get(timeout=10))
+    loop = asyncio.get_running_loop()
+    bots = []
+    try:
+        for _ in range(2 * matches):
+            _, bot = await loop.create_datagram_endpoint(Bot, remote_addr=address)
+            bots.append(bot)
+
+        async def drive(seconds):
+            interval = 1 / TICK_RATE
+            next_tick = loop.time()
+            end = next_tick + seconds
+            while next_tick < end:
+                now = time.monotonic()
+                for bot in bots:
+                    bot.step(now)
+                next_tick += interval
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+        await drive(1.0)  # Join and settle
+        for bot in bots:
+            if bot.client is not None:
+                bot.client.rtts.clear()
+        before = await server_stats(address)
+        await drive(args.seconds)
+        after = await server_stats(address)
+    finally:
+        for bot in bots:
+            bot.transport.sendto(bytes([LEAVE]))
+            bot.transport.close()
+        process.terminate()
+        process.join()
+
+    wall = after["wall"] - before["wall"]
+    cpu = (after["cpu"] - before["cpu"]) / wall
+    ticks = max(1, after["ticks"] - before["ticks"])
+    rtts = [rtt for bot in bots if bot.client is not None for rtt in bot.client.rtts]
+    corrections = sum(bot.client.corrections for bot in bots if bot.client is not None)
+    return {
+        "matches": after["matches"],
+        "rtt_median": statistics.median(rtts) if rtts else float("nan"),
+        "rtt_p95": statistics.quantiles(rtts, n=20)[-1] if len(rtts) > 1 else float("nan"),
+        "down_kbps": 8 * (after["bytes_out"] - before["bytes_out"]) / matches / wall / 1000,
+        "up_kbps": 8 * (after["bytes_in"] - before["bytes_in"]) / matches / wall / 1000,
+        "tick_ms": 1000 * (after["busy"] - before["busy"]) / ticks,
+        "overruns": after["overruns"] - before["overruns"],
+        "cpu": cpu,
+        "per_core": matches / cpu if cpu else float("inf"),
+        "corrections": corrections,
+    }
+
+
+def bench(args):
+    print(
+        f"Localhost bench: {args.latency:g} ms latency + up to {args.jitter:g} ms jitter each way, "
+        f"{100 * args.loss:g}% loss each way, {args.seconds:g} s per run"
+    )
+    print("matches  RTT median/p95 (ms)  kbit/s per match (down/up)  tick (ms)  overruns  server CPU  matches per core")
+    for matches in args.matches:
+        result = asyncio.run(bench_matches(matches, args))
+        print(
+            f"{result['matches']:7d}  {result['rtt_median']:8.1f} / {result['rtt_p95']:6.1f}"
+            f"  {result['down_kbps']:13.1f} / {result['up_kbps']:8.1f}"
+            f"  {result['tick_ms']:9.3f}  {result['overruns']:8d}  {100 * result['cpu']:9.1f}%"
+            f"  {result['per_core']:16.0f}"
+        )
+    print("Matches per core: matches / server CPU time per second, with the injected latency's timers included")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Networked Pong server and localhost bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="host matches")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    bench_parser = commands.add_parser("bench", help="measure a server on localhost with bot clients")
+    bench_parser.add_argument("--matches", type=int, nargs="+", default=[1, 10, 50, 100], help="match counts to run")
+    bench_parser.add_argument("--seconds", type=float, default=5.0, help="measured seconds per run")
+    for command, latency, loss in ((serve_parser, 0.0, 0.0), (bench_parser, 25.0, 0.01)):
+        command.add_argument("--latency", type=float, default=latency, help="milliseconds added to every packet, each way")
+        command.add_argument("--jitter", type=float, default=latency / 5, help="up to this many milliseconds more, at random")
+        command.add_argument("--loss", type=float, default=loss, help="fraction of the packets dropped, each way")
+        command.add_argument("--seed", type=int, default=0, help="random seed of the injected latency and loss")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.latency / 1000, args.jitter / 1000, args.loss, args.seed)
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# pong_tournament.py
+#
+# Headless Pong tournaments between paddle AIs: every AI plays every other
+# one (and itself) on both sides, ROUNDS times, with pong.step and no window
+# or frame cap. Matches are spread over a process pool and each result is
+# written to the output file as soon as it comes back, so a long run can be
+# watched (or cut short) while it goes.
+#
+# Each match gets its own seed, drawn from --seed, which picks the ball's
+# starting speed and direction and drives the AIs' randomness: the same seed
+# replays the same tournament, whatever the number of workers.
+#
+# Run `py .\pong_tournament.py` for a tournament, `--scaling` to time the
+# same matches with 1, 2, 4... workers up to the number of cores.
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+
+import pong
+
+# AIs: (state, side, rng) -> move (-1 up, 0, 1 down), side 0 being the left
+# paddle. They only get to see the state, like a player watching the screen.
+
+def paddle_y(state, side):
+    return state.player1_y if side == 0 else state.player2_y
+
+def towards(state, side, target_y):
+    offset = target_y - (paddle_y(state, side) + pong.PADDLE_HEIGHT / 2)
+    if abs(offset) <= pong.paddle_speed:
+        return 0
+    return 1 if offset > 0 else -1
+
+def ball_center(state):
+    return state.ball_y + pong.BALL_SIZE / 2
+
+def coming(state, side):
+    return state.ball_dx < 0 if side == 0 else state.ball_dx > 0
+
+# Keeps the paddle on the ball
+def follow(state, side, rng):
+    return towards(state, side, ball_center(state))
+
+# Only moves once the ball heads its way over its half of the court
+def lazy(state, side, rng):
+    in_half = state.ball_x < pong.WIDTH / 2 if side == 0 else state.ball_x > pong.WIDTH / 2
+    if coming(state, side) and in_half:
+        return towards(state, side, ball_center(state))
+    return 0
+
+# Goes where the ball will cross its paddle, folding its path over the walls,
+# and back to the middle while the ball goes away
+def predict(state, side, rng):
+    if not coming(state, side):
+        return towards(state, side, pong.HEIGHT / 2)
+    paddle_x = pong.PLAYER1_X + pong.PADDLE_WIDTH if side == 0 else pong.PLAYER2_X - pong.BALL_SIZE
+    ticks = (paddle_x - state.ball_x) / state.ball_dx
+    span = pong.HEIGHT - pong.BALL_SIZE
+    y = (state.ball_y + state.ball_dy * ticks) % (2 * span)
+    if y > span:
+        y = 2 * span - y
+    return towards(state, side, y + pong.BALL_SIZE / 2)
+
+# Follows the ball, but a third of the time does something at random instead
+def noisy(state, side, rng):
+    if rng.random() < 0.3:
+        return rng.choice((-1, 0, 1))
+    return towards(state, side, ball_center(state))
+
+AIS = {"follow": follow, "lazy": lazy, "predict": predict, "noisy": noisy}
+
+# Ball speed range along each axis, picked per match. Past paddle_speed the
+# paddles cannot just keep up with the ball.
+BALL_DX = (pong.ball_speed, 2 * pong.ball_speed)
+BALL_DY = (pong.ball_speed / 2, 2 * pong.ball_speed)
+POINTS = 5  # Points to win a match
+MAX_TICKS = 60 * 90  # Ticks before a match is called a draw, a minute and a half of pong.py
+
+RESULT_FIELDS = ["match", "seed", "left", "right", "left_score", "right_score", "ticks", "winner"]
+
+
+# Plays one match from a job (match, seed, left AI, right AI, points,
+# max_ticks). Runs in the pool's workers, so it only takes and returns plain data.
+def play_match(job):
+    match, seed, left, right, points, max_ticks = job
+    rng = random.Random(seed)
+    state = pong.new_state(
+        rng.choice((-1, 1)) * rng.uniform(*BALL_DX), rng.choice((-1, 1)) * rng.uniform(*BALL_DY)
+    )
+    left_ai, right_ai = AIS[left], AIS[right]
+    step = pong.step
+    ticks = 0
+    while ticks < max_ticks and state.player1_score < points and state.player2_score < points:
+        state = step(state, left_ai(state, 0, rng), right_ai(state, 1, rng))
+        ticks += 1
+
+    winner = "draw"
+    if state.player1_score >= points:
+        winner = "left"
+    elif state.player2_score >= points:
+        winner = "right"
+    return {
+        "match": match,
+        "seed": seed,
+        "left": left,
+        "right": right,
+        "left_score": state.player1_score,
+        "right_score": state.player2_score,
+        "ticks": ticks,
+        "winner": winner,
+    }
+
+
+def schedule(ais, rounds, seed, points=POINTS, max_ticks=MAX_TICKS):
+    rng = random.Random(seed)
+    jobs = []
+    for _ in range(rounds):
+        for left in ais:
+            for right in ais:
+                jobs.append((len(jobs), rng.getrandbits(32), left, right, points, max_ticks))
+    return jobs
+
+
+# Plays the jobs on `workers` processes, handing each result to `record` in
+# the order they finish. Returns the seconds it took.
+def run(jobs, workers, record=None):
+    # Small chunks keep results flowing and the workers evenly loaded, big
+    # enough ones keep the pool's own overhead out of the way
+    chunksize = max(1, len(jobs) // (workers * 32))
+    began = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_match, jobs, chunksize):
+            if record is not None:
+                record(result)
+    return time.perf_counter() - began
+
+
+# Results are streamed as CSV rows, or as JSON lines for any other extension
+def open_results(output):
+    file = open(output, "w", newline="")
+    if output.endswith(".csv"):
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(result):
+            file.write(json.dumps(result) + "\n")
+    return file, write
+
+
+def tournament(args, jobs):
+    wins, losses, draws = Counter(), Counter(), Counter()
+    ticks = 0
+    file, write = open_results(args.output)
+
+    def record(result):
+        nonlocal ticks
+        write(result)
+        file.flush()
+        ticks += result["ticks"]
+        sides = {"left": result["left"], "right": result["right"]}
+        if result["winner"] == "draw":
+            draws[result["left"]] += 1
+            draws[result["right"]] += 1
+        else:
+            loser = "right" if result["winner"] == "left" else "left"
+            wins[sides[result["winner"]]] += 1
+            losses[sides[loser]] += 1
+
+    with file:
+        seconds = run(jobs, args.workers, record)
+
+    print(f"{len(jobs)} matches on {args.workers} workers in {seconds:.2f} s, written to {args.output}")
+    print(
+        f"  {len(jobs) / seconds:,.1f} matches per second, {len(jobs) / seconds / args.workers:,.1f} per worker, "
+        f"{ticks / seconds:,.0f} ticks per second"
+    )
+    print("AI        wins  draws  losses")
+    for ai in sorted(args.ais, key=lambda ai: (wins[ai] - losses[ai], wins[ai]), reverse=True):
+        print(f"{ai:8}  {wins[ai]:4d}  {draws[ai]:5d}  {losses[ai]:6d}")
+
+
+def scaling(args, jobs):
+    cores = os.cpu_count() or 1
+    counts = sorted({1, cores} | {2 ** power for power in range(1, cores.bit_length()) if 2 ** power < cores})
+    print(f"{len(jobs)} matches per run, {cores} cores")
+    print("workers  matches/s  per worker  scaling (1.0 = linear)")
+    single = None
+    for workers in counts:
+        rate = len(jobs) / run(jobs, workers)
+        single = single or rate
+        print(f"{workers:7d}  {rate:9.1f}  {rate / workers:10.1f}  {rate / (single * workers):22.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Pong tournaments between paddle AIs")
+    parser.add_argument("--ais", nargs="+", choices=list(AIS), default=list(AIS), help="AIs taking part")
+    parser.add_argument("--rounds", type=int, default=100, help="times every AI plays every other on each side")
+    parser.add_argument("--points", type=int, default=POINTS, help="points to win a match")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="ticks before a match is a draw")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the tournament")
+    parser.add_argument("--output", default="tournament.jsonl", metavar="FILE", help="match results, .csv or JSON lines")
+    parser.add_argument("--scaling", action="store_true", help="time the matches with more and more workers instead")
+    args = parser.parse_args()
+    for option in ("rounds", "points", "max_ticks", "workers"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    args.ais = list(dict.fromkeys(args.ais))  # Each AI once, in the order given
+
+    jobs = schedule(args.ais, args.rounds, args.seed, args.points, args.max_ticks)
+    if args.scaling:
+        scaling(args, jobs)
+    else:
+        tournament(args, jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# raybands.py
+#
+# Multi-core ray casting for doom.py: the screen is split into column bands
+# that are cast on a pool of workers and written into one shared depth buffer,
+# which doom.py then draws as a single frame.
+#
+#   "thread"  - a thread pool running the renderer's caster on each band.
+#               The NumPy caster scales, since NumPy releases the GIL inside
+#               its array operations. The pure-Python one holds the GIL.
+#   "process" - a process pool running the pure-Python caster, with the view
+#               window and the depth buffer in shared memory so nothing but
+#               the band bounds is sent to the workers each frame
+#
+# This module does not import pygame and has no side effects on import, so
+# process workers can load it without opening a window.
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+WALL = 1
+
+
+# Grid traversal (DDA) of one ray over a flat byte grid, in grid coordinates.
+# Returns (distance, side, offset) of the first wall, or None past max_depth.
+def cast_ray(cells, width, height, x, y, angle, tile_size, max_depth):
+    sin_a = math.sin(angle)
+    cos_a = math.cos(angle)
+    map_x = int(x // tile_size)
+    map_y = int(y // tile_size)
+
+    # Distance along the ray between two vertical / horizontal grid lines
+    delta_x = abs(tile_size / cos_a) if cos_a else math.inf
+    delta_y = abs(tile_size / sin_a) if sin_a else math.inf
+
+    # Distance along the ray to the first vertical / horizontal grid line
+    if cos_a >= 0:
+        step_x = 1
+        side_x = ((map_x + 1) * tile_size - x) / cos_a if cos_a else math.inf
+    else:
+        step_x = -1
+        side_x = (x - map_x * tile_size) / -cos_a
+    if sin_a >= 0:
+        step_y = 1
+        side_y = ((map_y + 1) * tile_size - y) / sin_a if sin_a else math.inf
+    else:
+        step_y = -1
+        side_y = (y - map_y * tile_size) / -sin_a
+
+    while True:
+        if side_x < side_y:
+            depth = side_x
+            side_x += delta_x
+            map_x += step_x
+            side = 0  # Hit a vertical wall face
+        else:
+            depth = side_y
+            side_y += delta_y
+            map_y += step_y
+            side = 1  # Hit a horizontal wall face
+
+        if depth >= max_depth or not (0 <= map_x < width and 0 <= map_y < height):
+            return None
+        if cells[map_y * width + map_x] == WALL:
+            # Where along the wall face the ray landed, in [0, tile_size)
+            if side == 0:
+                offset = (y + depth * sin_a) % tile_size
+            else:
+                offset = (x + depth * cos_a) % tile_size
+            return depth, side, offset
+
+
+# Shared memory segments opened by this worker process, by name
+_segments = {}
+
+
+def _segment(name):
+    segment = _segments.get(name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=name)
+        _segments[name] = segment
+    return segment
+
+
+# Process worker: cast columns [start, stop) into the shared depth buffer
+def cast_band(map_name, width, height, depth_name, start, stop, x, y, angle, step, tile_size, max_depth):
+    began = time.perf_counter()
+    cells = _segment(map_name).buf
+    depths = _segment(depth_name).buf.cast("d")
+    for column in range(start, stop):
+        hit = cast_ray(cells, width, height, x, y, angle + column * step, tile_size, max_depth)
+        depths[column] = hit[0] if hit else math.inf
+    depths.release()
+    return os.getpid(), start, stop, time.perf_counter() - began
+
+
+class BandCaster:
+    def __init__(self, workers, mode, max_columns, max_cells):
+        self.workers = workers
+        self.mode = mode
+        self.max_columns = max_columns
+        self.frames = 0
+        self.frame_time = 0.0  # Total wall time spent casting, in seconds
+        self.worker_time = {}  # Total casting time per worker, in seconds
+        self.last_timings = []  # (worker, start, stop, seconds) of the last frame
+
+        if mode == "process":
+            self.pool = ProcessPoolExecutor(workers)
+            self.map_memory = shared_memory.SharedMemory(create=True, size=max_cells)
+            self.depth_memory = shared_memory.SharedMemory(create=True, size=8 * max_columns)
+            self.depths = self.depth_memory.buf.cast("d")
+            self.map_cells = None  # Window currently copied into map_memory
+        else:
+            self.pool = ThreadPoolExecutor(workers)
+
+    def bands(self, columns):
+        size = -(-columns // self.workers)
+        return [(start, min(start + size, columns)) for start in range(0, columns, size)]
+
+    # Process mode: cast `columns` rays starting at `angle`, `step` radians
+    # apart, from grid position (x, y) of the view window, and return the
+    # distance of every column (inf where nothing was hit)
+    def cast_shared(self, window, x, y, angle, step, columns, tile_size, max_depth):
+        began = time.perf_counter()
+        if self.map_cells is not window.cells:
+            self.map_cells = window.cells
+            self.map_memory.buf[: len(window.cells)] = window.cells
+        futures = [
+            self.pool.submit(
+                cast_band,
+                self.map_memory.name,
+                window.width,
+                window.height,
+                self.depth_memory.name,
+                start,
+                stop,
+                x,
+                y,
+                angle,
+                step,
+                tile_size,
+                max_depth,
+            )
+            for start, stop in self.bands(columns)
+        ]
+        self.collect(futures, began)
+        return self.depths[:columns].tolist()
+
+    # Thread mode: run cast(start, stop) for every band, the callable writes
+    # its results itself
+    def cast_threads(self, cast, columns):
+        began = time.perf_counter()
+        futures = [self.pool.submit(self._thread_band, cast, start, stop) for start, stop in self.bands(columns)]
+        self.collect(futures, began)
+
+    def collect(self, futures, began):
+        self.last_timings = [future.result() for future in futures]
+        self.frames += 1
+        self.frame_time += time.perf_counter() - began
+        for worker, _, _, seconds in self.last_timings:
+            self.worker_time[worker] = self.worker_time.get(worker, 0.0) + seconds
+
+    @staticmethod
+    def _thread_band(cast, start, stop):
+        began = time.perf_counter()
+        cast(start, stop)
+        return threading.get_ident(), start, stop, time.perf_counter() - began
+
+    def summary(self):
+        frames = max(1, self.frames)
+        lines = [f"Parallel casting ({self.mode}, {self.workers} workers): {1000 * self.frame_time / frames:.2f} ms per frame"]
+        for index, seconds in enumerate(self.worker_time.values()):
+            lines.append(f"  worker {index}: {1000 * seconds / frames:.2f} ms per frame")
+        return "\n".join(lines)
+
+    def close(self):
+        self.pool.shutdown()
+        if self.mode == "process":
+            self.depths.release()
+            for memory in (self.map_memory, self.depth_memory):
+                memory.close()
+                memory.unlink()
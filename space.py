@@ -1,14 +1,19 @@
 import pygame
+import argparse
+import csv
+import gc
+import json
+import os
 import random
 import sys
+import time
+from collections import defaultdict
 
-# Initialize pygame
-pygame.init()
+import numpy as np
 
 # Screen dimensions
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Space")
+screen = None  # Created by init_display()
 
 # Colors
 BLACK = (0, 0, 0)
@@ -17,8 +22,6 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)
 
-# Clock
-clock = pygame.time.Clock()
 FPS = 60
 
 # Player settings
@@ -26,28 +29,147 @@ player_width, player_height = 50, 15
 player_x = WIDTH // 2 - player_width // 2
 player_y = HEIGHT - 50
 player_speed = 5
-player_projectiles = []
 projectile_speed = -10
 projectile_size = 5
 
 # Enemy settings
-enemies = []
 enemy_speed = 1
-spawn_timer = 100
 
 # Power-up settings
-power_ups = []
-power_up_timer = 0
 POWER_UP_DURATION = 500
+POWER_UP_KINDS = ["speed", "rate", "size"]
+
+# Fonts, created by init_display()
+font = None
+large_font = None
+
+# Entity kinds in the store
+PROJECTILE, ENEMY, POWER_UP = 0, 1, 2
+
+# Every projectile, enemy and power-up lives in one struct-of-arrays store:
+# one NumPy array per field, one slot per entity. Moving, culling and
+# collision tests are then a few array operations per frame whatever the
+# number of entities. Freed slots go on a free list and are reused, and the
+# arrays double in size when they are full.
+class EntityStore:
+    FIELDS = [
+        ("x", np.float64),
+        ("y", np.float64),
+        ("width", np.float64),
+        ("height", np.float64),
+        ("vx", np.float64),
+        ("vy", np.float64),
+        ("health", np.int32),
+        ("kind", np.int8),
+        ("variant", np.int8),  # Power-up kind
+        ("alive", bool),
+        ("viewed", bool),  # A view of the slot was handed out
+    ]
+
+    def __init__(self, capacity=1024):
+        self.capacity = 0
+        self.peak = 0  # Highest slot handed out so far, plus one
+        self.free = []
+        self.pools = {}  # Kind -> ViewPool of the views handed out for it
+        self.spawned = 0
+        self.reused = 0  # Spawns that took a slot freed earlier rather than a new one
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        for name, dtype in self.FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            array[: self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        # Highest slots first, so pop() hands out the lowest free slot
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def spawn(self, kind, x, y, width, height, vx=0, vy=0, health=1, variant=0):
+        if not self.free:
+            self.grow(2 * self.capacity)
+        slot = self.free.pop()
+        self.spawned += 1
+        self.reused += slot < self.peak
+        self.peak = max(self.peak, slot + 1)
+        self.x[slot] = x
+        self.y[slot] = y
+        self.width[slot] = width
+        self.height[slot] = height
+        self.vx[slot] = vx
+        self.vy[slot] = vy
+        self.health[slot] = health
+        self.kind[slot] = kind
+        self.variant[slot] = variant
+        self.alive[slot] = True
+        return slot
+
+    def kill(self, slots):
+        slots = slots[self.alive[slots]]  # A slot freed twice would be handed out twice
+        viewed = slots[self.viewed[slots]]
+        if len(viewed):
+            for slot, kind in zip(viewed.tolist(), self.kind[viewed].tolist()):
+                self.pools[kind].release(slot)
+            self.viewed[viewed] = False
+        self.alive[slots] = False
+        self.free.extend(slots.tolist())
+
+    def live(self, kind):
+        return np.flatnonzero(self.alive & (self.kind == kind))
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def summary(self):
+        return (
+            f"Entity store: {self.spawned} spawns, {100 * self.reused / max(1, self.spawned):.1f}% in reused slots, "
+            f"{self.peak} slots used at most ({self.capacity} allocated)"
+        )
 
-# Score and game state
-score = 0
-power_up_active = False
-power_up_type = None
-
-# Fonts
-font = pygame.font.Font(None, 36)
-large_font = pygame.font.Font(None, 72)
+    def move(self):
+        self.x += self.vx
+        self.y += self.vy
+
+    # Free everything that left the screen vertically
+    def cull(self):
+        self.kill(np.flatnonzero(self.alive & ((self.y < 0) | (self.y > HEIGHT))))
+
+store = EntityStore()
+
+# Entity classes are thin views of one store slot, for gameplay code that
+# handles a single entity. Bulk work (moving, culling, drawing, collisions)
+# runs on the store arrays directly. Spawning only returns the slot, and a
+# view is made when asked for with view(slot). Views carry nothing but their
+# slot (__slots__, no __dict__) and are recycled: every class has a pool of
+# preallocated views, a view goes back to it when its entity is killed, and
+# must not be used after that.
+def store_field(name):
+    return property(
+        lambda self: getattr(store, name)[self.slot].item(),
+        lambda self, value: getattr(store, name).__setitem__(self.slot, value),
+    )
+
+class Entity:
+    __slots__ = ("slot",)
+
+    x = store_field("x")
+    y = store_field("y")
+    width = store_field("width")
+    height = store_field("height")
+    speed = store_field("vy")
+    health = store_field("health")
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    # The view of a live slot of this class, the same one until it is killed
+    @classmethod
+    def view(cls, slot):
+        return cls.pool.acquire(slot)
+
+    def kill(self):
+        store.kill(np.array([self.slot]))
 
 class Player:
     def __init__(self, x, y):
@@ -74,146 +196,719 @@ class Player:
         current_time = pygame.time.get_ticks()
         if current_time - self.last_shot_time > self.rate_of_fire:
             self.last_shot_time = current_time
-            projectile = Projectile(self.x + self.width // 2, self.y, self.projectile_size)
-            player_projectiles.append(projectile)
-
-class Projectile:
-    def __init__(self, x, y, size):
-        self.x = x
-        self.y = y
-        self.size = size
-        self.color = WHITE
-        self.speed = projectile_speed
-
-    def move(self):
-        self.y += self.speed
+            Projectile.spawn(self.x + self.width // 2, self.y, self.projectile_size)
+
+# Fixed-capacity pool of views of one class. A miss allocates a new view when
+# the pool is empty, and no more than capacity views are kept once released.
+# Only slots that gameplay code asked a view for go through it.
+class ViewPool:
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.capacity = capacity
+        self.free = [cls.__new__(cls) for _ in range(capacity)]
+        self.views = {}  # Slot -> view of the live entities
+        self.hits = 0
+        self.misses = 0
+        self.peak = 0
+
+    def acquire(self, slot):
+        view = self.views.get(slot)
+        if view is not None:
+            return view
+        if self.free:
+            view = self.free.pop()
+            self.hits += 1
+        else:
+            view = self.cls.__new__(self.cls)
+            self.misses += 1
+        view.slot = slot
+        self.views[slot] = view
+        store.viewed[slot] = True
+        self.peak = max(self.peak, len(self.views))
+        return view
+
+    def release(self, slot):
+        view = self.views.pop(slot)
+        if len(self.free) < self.capacity:
+            self.free.append(view)
+
+    def summary(self):
+        return f"{self.cls.__name__} pool: {self.hits} hits, {self.misses} misses, {self.peak} peak ({self.capacity} capacity)"
+
+class Projectile(Entity):
+    __slots__ = ()
+    color = WHITE
+    size = store_field("width")
+
+    @classmethod
+    def spawn(cls, x, y, size):
+        return store.spawn(PROJECTILE, x, y, size, size, vy=projectile_speed)
 
     def draw(self):
         pygame.draw.circle(screen, self.color, (self.x, self.y), self.size)
 
-class Enemy:
-    def __init__(self, x, y, health=1):
-        self.x = x
-        self.y = y
-        self.width = 40
-        self.height = 30
-        self.color = RED
-        self.speed = enemy_speed
-        self.health = health
+class Enemy(Entity):
+    __slots__ = ()
+    color = RED
 
-    def move(self):
-        self.y += self.speed
+    @classmethod
+    def spawn(cls, x, y, health=1):
+        return store.spawn(ENEMY, x, y, 40, 30, vy=enemy_speed, health=health)
 
     def draw(self):
         pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
         if self.health > 1:
             pygame.draw.rect(screen, YELLOW, (self.x, self.y - 5, self.width * (self.health / 3), 5))
 
-class PowerUp:
-    def __init__(self, x, y, kind):
-        self.x = x
-        self.y = y
-        self.kind = kind
-        self.width = 15
-        self.height = 15
-        self.color = GREEN if kind == "speed" else YELLOW if kind == "rate" else WHITE
+class PowerUp(Entity):
+    __slots__ = ()
+    COLORS = [GREEN, YELLOW, WHITE]  # By kind, in POWER_UP_KINDS order
 
-    def move(self):
-        self.y += 3
+    @classmethod
+    def spawn(cls, x, y, kind):
+        return store.spawn(POWER_UP, x, y, 15, 15, vy=3, variant=POWER_UP_KINDS.index(kind))
+
+    @property
+    def kind(self):
+        return POWER_UP_KINDS[store.variant[self.slot]]
+
+    @property
+    def color(self):
+        return self.COLORS[store.variant[self.slot]]
 
     def draw(self):
         pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
 
-player = Player(player_x, player_y)
+Projectile.pool = ViewPool(Projectile, 512)
+Enemy.pool = ViewPool(Enemy, 256)
+PowerUp.pool = ViewPool(PowerUp, 16)
+store.pools = {PROJECTILE: Projectile.pool, ENEMY: Enemy.pool, POWER_UP: PowerUp.pool}
+
+# Every sprite drawn in the game, pre-rendered once into one atlas Surface:
+# enemies for each health (with their health bar), projectiles for each size
+# and power-ups for each kind. Transparent parts are black, the colorkey.
+class SpriteAtlas:
+    def __init__(self, sprites):
+        width = sum(sprite.get_width() for sprite in sprites.values())
+        height = max(sprite.get_height() for sprite in sprites.values())
+        self.surface = pygame.Surface((width, height))
+        self.surface.set_colorkey(BLACK)
+        self.areas = {}
+        x = 0
+        for key, sprite in sprites.items():
+            self.surface.blit(sprite, (x, 0))
+            self.areas[key] = pygame.Rect(x, 0, sprite.get_width(), sprite.get_height())
+            x += sprite.get_width()
+        # Enemy areas by health and power-up areas by kind, for list lookups
+        self.enemy_areas = [None] + [self.areas[("enemy", health)] for health in (1, 2, 3)]
+        self.power_up_areas = [self.areas[("power_up", variant)] for variant in range(len(POWER_UP_KINDS))]
+
+def build_atlas():
+    sprites = {}
+    for health in (1, 2, 3):
+        # The body with the health bar above it, drawn 5 pixels above the enemy
+        sprite = pygame.Surface((40, 35))
+        pygame.draw.rect(sprite, Enemy.color, (0, 5, 40, 30))
+        if health > 1:
+            pygame.draw.rect(sprite, YELLOW, (0, 0, 40 * (health / 3), 5))
+        sprites[("enemy", health)] = sprite
+    for size in sorted({projectile_size, 10}):  # Normal and "size" power-up projectiles
+        sprite = pygame.Surface((2 * size, 2 * size))
+        pygame.draw.circle(sprite, Projectile.color, (size, size), size)
+        sprites[("projectile", size)] = sprite
+    for variant, color in enumerate(PowerUp.COLORS):
+        sprite = pygame.Surface((15, 15))
+        sprite.fill(color)
+        sprites[("power_up", variant)] = sprite
+    sprite = pygame.Surface((player_width, player_height))
+    sprite.fill(GREEN)
+    sprites["player"] = sprite
+    return SpriteAtlas(sprites)
+
+atlas = None  # Built by init_display()
+
+# Score text, rendered again only when the score changes
+score_text = None
+score_text_value = None
+
+def score_surface(value):
+    global score_text, score_text_value
+    if value != score_text_value:
+        score_text = font.render(f"Score: {value}", True, WHITE)
+        score_text_value = value
+    return score_text
+
+# Explosion and thruster particles. The live particles are packed at the
+# front of preallocated NumPy arrays: emitting writes after them, and every
+# frame they are moved, aged and the expired ones dropped by compacting the
+# arrays in a few vectorized passes. They are drawn as 2 x 2 pixel dots
+# straight into the screen pixels, fading out with age.
+PARTICLE_CAPACITY = 65536
+EXPLOSION_PARTICLES = 80
+THRUSTER_PARTICLES = 3  # Per frame
+
+class ParticleSystem:
+    FIELDS = [("x", np.float32), ("y", np.float32), ("vx", np.float32), ("vy", np.float32), ("life", np.float32), ("max_life", np.float32)]
+
+    def __init__(self, capacity=PARTICLE_CAPACITY, gravity=0.05, seed=None):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.color = np.zeros((capacity, 3), dtype=np.float32)
+        self.frames = 0
+        self.peak = 0
+        self.update_time = 0.0
+        self.draw_time = 0.0
+
+    # Emit count particles from (x, y), in directions spread around angle
+    # (radians, 0 = right, pi / 2 = down), dropped when the arrays are full
+    def emit(self, x, y, count, color, speed=3.0, life=40, angle=0.0, spread=2 * np.pi):
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        new = slice(self.count, self.count + count)
+        rng = self.rng
+        directions = angle + (rng.random(count, dtype=np.float32) - 0.5) * spread
+        speeds = speed * rng.random(count, dtype=np.float32)
+        self.x[new] = x
+        self.y[new] = y
+        self.vx[new] = np.cos(directions) * speeds
+        self.vy[new] = np.sin(directions) * speeds
+        self.max_life[new] = life * (0.5 + rng.random(count, dtype=np.float32))
+        self.life[new] = self.max_life[new]
+        self.color[new] = color
+        self.count += count
+
+    def update(self):
+        began = time.perf_counter()
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += self.gravity
+        self.life[:n] -= 1
+        keep = (self.life[:n] > 0) & (self.x[:n] >= 0) & (self.x[:n] < WIDTH - 1) & (self.y[:n] >= 0) & (self.y[:n] < HEIGHT - 1)
+        live = int(keep.sum())
+        if live < n:
+            for name, _ in self.FIELDS:
+                array = getattr(self, name)
+                array[:live] = array[:n][keep]
+            self.color[:live] = self.color[:n][keep]
+            self.count = live
+        self.frames += 1
+        self.peak = max(self.peak, self.count)
+        self.update_time += time.perf_counter() - began
+
+    def draw(self, surface):
+        began = time.perf_counter()
+        n = self.count
+        if n:
+            x = self.x[:n].astype(np.intp)
+            y = self.y[:n].astype(np.intp)
+            fade = (self.life[:n] / self.max_life[:n])[:, None]
+            colors = pygame.surfarray.map_array(surface, (self.color[:n] * fade).astype(np.uint8)[:, None, :])[:, 0]
+            pixels = pygame.surfarray.pixels2d(surface)
+            for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+                pixels[x + dx, y + dy] = colors
+            del pixels  # Unlock the surface
+        self.draw_time += time.perf_counter() - began
+
+    def summary(self):
+        frames = max(1, self.frames)
+        return (
+            f"Particles: {self.count} live, {self.peak} at peak, {1000 * self.update_time / frames:.3f} ms update, "
+            f"{1000 * self.draw_time / frames:.3f} ms draw per frame"
+        )
+
+particles = ParticleSystem()
+
+# Draw every live entity straight from the store arrays, then the score and
+# the player, with a single Surface.blits call for the whole frame
+def draw_frame(player, score):
+    source = atlas.surface
+    blits = []
+
+    projectiles = store.live(PROJECTILE)
+    for x, y, size in zip(store.x[projectiles].tolist(), store.y[projectiles].tolist(), store.width[projectiles].tolist()):
+        size = int(size)
+        blits.append((source, (x - size, y - size), atlas.areas[("projectile", size)]))
+
+    enemies = store.live(ENEMY)
+    health = np.clip(store.health[enemies], 1, 3).tolist()
+    blits += zip([source] * len(enemies), zip(store.x[enemies].tolist(), (store.y[enemies] - 5).tolist()), [atlas.enemy_areas[h] for h in health])
+
+    power_ups = store.live(POWER_UP)
+    variants = store.variant[power_ups].tolist()
+    blits += zip([source] * len(power_ups), zip(store.x[power_ups].tolist(), store.y[power_ups].tolist()), [atlas.power_up_areas[v] for v in variants])
+
+    blits.append((score_surface(score), (10, 10)))
+    blits.append((source, (player.x, player.y), atlas.areas["player"]))
+    screen.blits(blits, doreturn=False)
+
+# The same frame with one pygame.draw call per entity and the score rendered
+# every frame, to compare against draw_frame
+def draw_frame_primitives(player, score):
+    projectiles = store.live(PROJECTILE)
+    for x, y, size in zip(store.x[projectiles].tolist(), store.y[projectiles].tolist(), store.width[projectiles].tolist()):
+        pygame.draw.circle(screen, Projectile.color, (x, y), size)
+
+    enemies = store.live(ENEMY)
+    for x, y, width, height, health in zip(
+        store.x[enemies].tolist(),
+        store.y[enemies].tolist(),
+        store.width[enemies].tolist(),
+        store.height[enemies].tolist(),
+        store.health[enemies].tolist(),
+    ):
+        pygame.draw.rect(screen, Enemy.color, (x, y, width, height))
+        if health > 1:
+            pygame.draw.rect(screen, YELLOW, (x, y - 5, width * (health / 3), 5))
+
+    power_ups = store.live(POWER_UP)
+    for x, y, width, height, variant in zip(
+        store.x[power_ups].tolist(),
+        store.y[power_ups].tolist(),
+        store.width[power_ups].tolist(),
+        store.height[power_ups].tolist(),
+        store.variant[power_ups].tolist(),
+    ):
+        pygame.draw.rect(screen, PowerUp.COLORS[variant], (x, y, width, height))
+
+    screen.blit(font.render(f"Score: {score}", True, WHITE), (10, 10))
+    player.draw()
 
-def spawn_enemy():
+# Uniform grid broadphase: enemies are bucketed by the cells their rectangle
+# covers, so a projectile is only tested against the enemies sharing its cell
+class SpatialHash:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, item, x, y, width, height):
+        size = self.cell_size
+        for cell_x in range(int(x) // size, int(x + width) // size + 1):
+            for cell_y in range(int(y) // size, int(y + height) // size + 1):
+                self.cells.setdefault((cell_x, cell_y), []).append(item)
+
+    # Items whose cells contain the point (x, y), in insertion order
+    def query_point(self, x, y):
+        return self.cells.get((int(x) // self.cell_size, int(y) // self.cell_size), ())
+
+enemy_grid = SpatialHash()
+
+# Projectile/enemy collisions. Both back-ends take the damage off the enemies'
+# health and return the slots of the projectiles spent on them: a projectile
+# hits the first enemy (lowest slot) it is inside, and an enemy absorbs no
+# more projectiles than it has health left.
+
+# One projectile at a time against the enemies in its SpatialHash cell
+def collide_hash(projectiles, enemies):
+    enemy_grid.clear()
+    for slot, x, y in zip(enemies.tolist(), store.x[enemies].tolist(), store.y[enemies].tolist()):
+        enemy_grid.insert(slot, x, y, store.width[slot], store.height[slot])
+
+    spent = []
+    for projectile, x, y in zip(projectiles.tolist(), store.x[projectiles].tolist(), store.y[projectiles].tolist()):
+        for enemy in enemy_grid.query_point(x, y):
+            if (
+                store.health[enemy] > 0
+                and store.x[enemy] < x < store.x[enemy] + store.width[enemy]
+                and store.y[enemy] < y < store.y[enemy] + store.height[enemy]
+            ):
+                store.health[enemy] -= 1
+                spent.append(projectile)
+                break
+    return np.array(spent, dtype=np.intp)
+
+# All projectiles at once: enemies are listed once per grid cell their
+# rectangle covers, sorted by cell, and every projectile finds the enemies of
+# its cell with a binary search. The candidate pairs are then tested exactly.
+GRID_CELL = 64
+GRID_STRIDE = 1 << 16  # Cell key = row * GRID_STRIDE + column
+
+def collide_grid(projectiles, enemies):
+    if not len(projectiles) or not len(enemies):
+        return np.zeros(0, dtype=np.intp)
+    px, py = store.x[projectiles], store.y[projectiles]
+    ex, ey = store.x[enemies], store.y[enemies]
+    ew, eh = store.width[enemies], store.height[enemies]
+
+    # (cell, enemy) pairs, an enemy covers at most 2 x 2 cells
+    col0, col1 = (ex // GRID_CELL).astype(np.int64), ((ex + ew) // GRID_CELL).astype(np.int64)
+    row0, row1 = (ey // GRID_CELL).astype(np.int64), ((ey + eh) // GRID_CELL).astype(np.int64)
+    index = np.arange(len(enemies))
+    wide, tall = col1 != col0, row1 != row0
+    keys = np.concatenate(
+        (
+            row0 * GRID_STRIDE + col0,
+            (row0 * GRID_STRIDE + col1)[wide],
+            (row1 * GRID_STRIDE + col0)[tall],
+            (row1 * GRID_STRIDE + col1)[wide & tall],
+        )
+    )
+    owners = np.concatenate((index, index[wide], index[tall], index[wide & tall]))
+    order = np.argsort(keys, kind="stable")
+    keys, owners = keys[order], owners[order]
+
+    # Candidate enemies of every projectile: the run of its cell in the sorted keys
+    cells = (py // GRID_CELL).astype(np.int64) * GRID_STRIDE + (px // GRID_CELL).astype(np.int64)
+    starts = np.searchsorted(keys, cells, "left")
+    counts = np.searchsorted(keys, cells, "right") - starts
+    total = int(counts.sum())
+    if not total:
+        return np.zeros(0, dtype=np.intp)
+    pair_projectile = np.repeat(np.arange(len(projectiles)), counts)
+    pair_enemy = owners[np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)]
+
+    x, y = px[pair_projectile], py[pair_projectile]
+    left, top = ex[pair_enemy], ey[pair_enemy]
+    inside = (left < x) & (x < left + ew[pair_enemy]) & (top < y) & (y < top + eh[pair_enemy])
+    pair_projectile, pair_enemy = pair_projectile[inside], pair_enemy[inside]
+    if not len(pair_projectile):
+        return np.zeros(0, dtype=np.intp)
+
+    # Every projectile takes the first enemy it is inside. When no enemy gets
+    # more of them than it has health, that is also what collide_hash does;
+    # otherwise the pairs are settled one projectile at a time, in slot order,
+    # each taking its first enemy that still has health.
+    order = np.lexsort((pair_enemy, pair_projectile))
+    pair_projectile, pair_enemy = pair_projectile[order], pair_enemy[order]
+    health = store.health[enemies]
+    hit, first = np.unique(pair_projectile, return_index=True)
+    demand = np.bincount(pair_enemy[first], minlength=len(enemies))
+    if (demand <= health).all():
+        health -= demand.astype(health.dtype)
+    else:
+        health = health.tolist()
+        hit = []
+        for projectile, enemy in zip(pair_projectile.tolist(), pair_enemy.tolist()):
+            if health[enemy] > 0 and (not hit or hit[-1] != projectile):
+                health[enemy] -= 1
+                hit.append(projectile)
+        hit = np.array(hit, dtype=np.intp)
+    store.health[enemies] = health
+    return projectiles[hit]
+
+# Runs both back-ends on the same random scenes, crowded enough for enemies
+# to overlap and be hit by more projectiles than they have health, and
+# returns the number of scenes where they disagree on the projectiles spent
+# or the health left. Uses the store, which it leaves empty.
+def check_collisions(scenes, seed=0):
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(scenes):
+        store.kill(np.flatnonzero(store.alive))
+        for _ in range(rng.integers(1, 40)):
+            store.spawn(ENEMY, rng.uniform(0, 200), rng.uniform(0, 150), 40, 30, health=rng.integers(1, 4))
+        for _ in range(rng.integers(1, 120)):
+            store.spawn(PROJECTILE, rng.uniform(0, 240), rng.uniform(0, 180), projectile_size, projectile_size)
+        projectiles, enemies = store.live(PROJECTILE), store.live(ENEMY)
+        health = store.health[enemies].copy()
+        by_hash = collide_hash(projectiles, enemies), store.health[enemies].copy()
+        store.health[enemies] = health
+        by_grid = collide_grid(projectiles, enemies), store.health[enemies].copy()
+        if not all(np.array_equal(a, b) for a, b in zip(by_hash, by_grid)):
+            mismatches += 1
+    store.kill(np.flatnonzero(store.alive))
+    return mismatches
+
+COLLISIONS = {"grid": collide_grid, "hash": collide_hash}
+RENDERERS = {"atlas": draw_frame, "primitives": draw_frame_primitives}
+collide = collide_grid
+draw_entities = draw_frame
+
+def spawn_enemy(y=0):
     x = random.randint(0, WIDTH - 40)
     health = random.choice([1, 2, 3]) if random.random() > 0.7 else 1
-    enemies.append(Enemy(x, 0, health))
-
-# Game Loop
-running = True
-while running:
-    screen.fill(BLACK)
-    keys = pygame.key.get_pressed()
-
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-            player.shoot()
-
-    # Player movement
-    player.move(keys)
-
-    # Move and draw projectiles
-    for projectile in player_projectiles[:]:
-        projectile.move()
-        if projectile.y < 0:
-            player_projectiles.remove(projectile)
-        projectile.draw()
-
-    # Enemy spawning and movement
-    if spawn_timer <= 0:
-        spawn_enemy()
-        spawn_timer = max(20, 100 - score // 5)  # Faster spawns over time
-    else:
-        spawn_timer -= 1
+    Enemy.spawn(x, y, health)
+
+# Player, score and power-up state, and one frame of the game
+class Game:
+    def __init__(self):
+        self.player = Player(player_x, player_y)
+        self.score = 0
+        self.spawn_timer = 100
+        self.power_up_active = False
+        self.power_up_type = None
+        self.power_up_timer = 0
+
+    def update(self, keys):
+        player = self.player
+
+        # Player movement
+        player.move(keys)
+
+        # Enemy spawning
+        if self.spawn_timer <= 0:
+            spawn_enemy()
+            self.spawn_timer = max(20, 100 - self.score // 5)  # Faster spawns over time
+        else:
+            self.spawn_timer -= 1
+
+        # Move projectiles, enemies and power-ups, and drop the ones that left the screen
+        store.move()
+        store.cull()
 
-    for enemy in enemies[:]:
-        enemy.move()
-        if enemy.y > HEIGHT:
-            enemies.remove(enemy)
-            continue
-        enemy.draw()
         # Collision with player projectiles
-        for projectile in player_projectiles[:]:
-            if (enemy.x < projectile.x < enemy.x + enemy.width) and (enemy.y < projectile.y < enemy.y + enemy.height):
-                enemy.health -= 1
-                player_projectiles.remove(projectile)
-                if enemy.health <= 0:
-                    enemies.remove(enemy)
-                    score += 1
-                    break
-
-    # Draw power-ups
-    for power_up in power_ups[:]:
-        power_up.move()
-        power_up.draw()
-        if (player.x < power_up.x < player.x + player.width) and (player.y < power_up.y < player.y + player.height):
-            power_up_type = power_up.kind
-            power_up_timer = POWER_UP_DURATION
-            power_up_active = True
-            power_ups.remove(power_up)
-
-    # Handle power-ups
-    if power_up_active:
-        if power_up_type == "speed":
-            player.speed = 8
-        elif power_up_type == "rate":
-            player.rate_of_fire = 150
-        elif power_up_type == "size":
-            player.projectile_size = 10
-        power_up_timer -= 1
-        if power_up_timer <= 0:
-            power_up_active = False
-            player.speed = player_speed
-            player.rate_of_fire = 300
-            player.projectile_size = projectile_size
-
-    # Display score
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
-
-    # Draw player
-    player.draw()
-
-    # Update display
-    pygame.display.flip()
+        enemies = store.live(ENEMY)
+        spent = collide(store.live(PROJECTILE), enemies)
+        if len(spent):
+            store.kill(spent)
+            destroyed = enemies[store.health[enemies] <= 0]
+            self.score += len(destroyed)
+            store.kill(destroyed)
+            for x, y in zip(store.x[destroyed].tolist(), store.y[destroyed].tolist()):
+                particles.emit(x + 20, y + 15, EXPLOSION_PARTICLES, (255, 160, 40))
+
+        # Power-up pickups
+        power_ups = store.live(POWER_UP)
+        caught = power_ups[
+            (player.x < store.x[power_ups])
+            & (store.x[power_ups] < player.x + player.width)
+            & (player.y < store.y[power_ups])
+            & (store.y[power_ups] < player.y + player.height)
+        ]
+        if len(caught):
+            self.power_up_type = POWER_UP_KINDS[store.variant[caught[-1]]]
+            self.power_up_timer = POWER_UP_DURATION
+            self.power_up_active = True
+            store.kill(caught)
+
+        # Handle power-ups
+        if self.power_up_active:
+            if self.power_up_type == "speed":
+                player.speed = 8
+            elif self.power_up_type == "rate":
+                player.rate_of_fire = 150
+            elif self.power_up_type == "size":
+                player.projectile_size = 10
+            self.power_up_timer -= 1
+            if self.power_up_timer <= 0:
+                self.power_up_active = False
+                player.speed = player_speed
+                player.rate_of_fire = 300
+                player.projectile_size = projectile_size
+
+        # Thruster exhaust
+        particles.emit(player.x + player.width / 2, player.y + player.height, THRUSTER_PARTICLES, (120, 180, 255), speed=2.0, life=15, angle=np.pi / 2, spread=0.6)
+        particles.update()
 
-    # Frame rate
-    clock.tick(FPS)
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    def draw(self):
+        screen.fill(BLACK)
+        particles.draw(screen)  # Under the sprites
+        draw_entities(self.player, self.score)
+        pygame.display.flip()
+
+# Garbage collector pauses, measured through gc.callbacks
+gc_collections = 0
+gc_time = 0.0
+gc_started = 0.0
+
+def time_gc(phase, info):
+    global gc_collections, gc_time, gc_started
+    if phase == "start":
+        gc_started = time.perf_counter()
+    else:
+        gc_collections += 1
+        gc_time += time.perf_counter() - gc_started
+
+def play(game):
+    clock = pygame.time.Clock()
+    frames = 0
+    frame_time = 0.0
+    worst_frame = 0.0
+    peak_entities = 0
+
+    # Game Loop
+    running = True
+    while running:
+        began = time.perf_counter()
+        keys = pygame.key.get_pressed()
+
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                game.player.shoot()
+
+        game.update(keys)
+        game.draw()
+
+        frames += 1
+        frame_seconds = time.perf_counter() - began
+        frame_time += frame_seconds
+        worst_frame = max(worst_frame, frame_seconds)
+        peak_entities = max(peak_entities, len(store))
+
+        # Frame rate
+        clock.tick(FPS)
+
+    print(
+        f"{frames} frames: {1000 * frame_time / max(1, frames):.2f} ms average, {1000 * worst_frame:.2f} ms worst, "
+        f"{peak_entities} entities at peak"
+    )
+
+# Stress mode: scripted waves, each spawning enemies, projectiles and power-ups
+# at a fixed rate per frame (fractions carry over to the next frame) for a
+# number of frames, on top of whatever is still alive from earlier waves.
+# Enemies appear anywhere in the top half of the screen, projectiles fire up
+# from the player's row and power-ups fall from the top.
+DEFAULT_WAVES = [
+    {"frames": 90, "enemies": enemies, "projectiles": 8 * enemies, "power_ups": 0.05}
+    for enemies in (0.5, 1, 2, 4, 8, 16, 24, 32)
+]
+
+STRESS_FIELDS = ["wave", "frame", "entities", "enemies", "projectiles", "particles", "update_ms", "draw_ms", "frame_ms"]
+
+def run_stress(game, waves, output, settings):
+    no_keys = defaultdict(bool)
+    rows = []
+    frame = 0
+    for wave_index, wave in enumerate(waves):
+        carry = defaultdict(float)
+        for _ in range(wave["frames"]):
+            pygame.event.pump()
+            for kind in ("enemies", "projectiles", "power_ups"):
+                carry[kind] += wave.get(kind, 0)
+                count = int(carry[kind])
+                carry[kind] -= count
+                for _ in range(count):
+                    if kind == "enemies":
+                        spawn_enemy(random.randint(0, HEIGHT // 2))
+                    elif kind == "projectiles":
+                        Projectile.spawn(random.randint(0, WIDTH), player_y, projectile_size)
+                    else:
+                        PowerUp.spawn(random.randint(0, WIDTH - 15), 0, random.choice(POWER_UP_KINDS))
+
+            began = time.perf_counter()
+            game.update(no_keys)
+            updated = time.perf_counter()
+            game.draw()
+            ended = time.perf_counter()
+            rows.append(
+                {
+                    "wave": wave_index,
+                    "frame": frame,
+                    "entities": len(store),
+                    "enemies": len(store.live(ENEMY)),
+                    "projectiles": len(store.live(PROJECTILE)),
+                    "particles": particles.count,
+                    "update_ms": round(1000 * (updated - began), 3),
+                    "draw_ms": round(1000 * (ended - updated), 3),
+                    "frame_ms": round(1000 * (ended - began), 3),
+                }
+            )
+            frame += 1
+
+    if output.endswith(".json"):
+        with open(output, "w") as file:
+            json.dump({"settings": settings, "waves": waves, "frames": rows}, file, indent=1)
+    else:
+        with open(output, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=STRESS_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    print(f"Stress run ({', '.join(f'{key} {value}' for key, value in settings.items())}), written to {output}")
+    for wave_index in range(len(waves)):
+        wave_rows = [row for row in rows if row["wave"] == wave_index]
+        if not wave_rows:
+            continue
+        entities = sum(row["entities"] for row in wave_rows) / len(wave_rows)
+        average = sum(row["frame_ms"] for row in wave_rows) / len(wave_rows)
+        worst = max(row["frame_ms"] for row in wave_rows)
+        print(f"  wave {wave_index}: {entities:8.0f} entities, {average:7.2f} ms average, {worst:7.2f} ms worst")
+
+def init_display():
+    global screen, font, large_font, atlas
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Space")
+    font = pygame.font.Font(None, 36)
+    large_font = pygame.font.Font(None, 72)
+    atlas = build_atlas()
+
+def main():
+    global collide, draw_entities, particles
+    parser = argparse.ArgumentParser(description="Space shooter")
+    parser.add_argument(
+        "--collisions",
+        choices=list(COLLISIONS),
+        default="grid",
+        help="projectile/enemy collision back-end: vectorized sorted grid (default) or per-projectile spatial hash",
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=list(RENDERERS),
+        default="atlas",
+        help="draw sprites from the atlas with one blits call (default) or with one pygame.draw call each",
+    )
+    parser.add_argument("--no-gc", action="store_true", help="disable the cyclic garbage collector while playing")
+    parser.add_argument("--stress", action="store_true", help="run the scripted stress waves headless and record frame times")
+    parser.add_argument("--waves", metavar="FILE", help="JSON list of stress waves (default: a built-in ramp)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the stress run")
+    parser.add_argument("--output", default="stress.csv", metavar="FILE", help="stress results, .csv or .json")
+    parser.add_argument(
+        "--check-collisions",
+        type=int,
+        metavar="SCENES",
+        help="compare the collision back-ends on this many random scenes (seeded by --seed) and exit",
+    )
+    args = parser.parse_args()
+
+    if args.check_collisions is not None:
+        if args.check_collisions < 1:
+            parser.error("--check-collisions needs at least 1 scene")
+        mismatches = check_collisions(args.check_collisions, args.seed)
+        print(f"Collision back-ends: {mismatches} of {args.check_collisions} random scenes differ")
+        sys.exit(1 if mismatches else 0)
+
+    waves = DEFAULT_WAVES
+    if args.waves:
+        with open(args.waves) as file:
+            waves = json.load(file)
+        if not isinstance(waves, list) or not waves:
+            parser.error(f"{args.waves}: expected a non-empty JSON list of waves")
+        for index, wave in enumerate(waves):
+            frames = wave.get("frames") if isinstance(wave, dict) else None
+            if not isinstance(frames, int) or frames <= 0:
+                parser.error(f"{args.waves}: wave {index} needs a positive whole number of \"frames\"")
+
+    collide = COLLISIONS[args.collisions]
+    draw_entities = RENDERERS[args.renderer]
+    if args.stress:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        random.seed(args.seed)
+        particles = ParticleSystem(seed=args.seed)
+    init_display()
+    game = Game()
+
+    gc.callbacks.append(time_gc)
+    if args.no_gc:
+        gc.freeze()  # Leave everything allocated so far out of later collections
+        gc.disable()
+
+    if args.stress:
+        settings = {"collisions": args.collisions, "renderer": args.renderer, "seed": args.seed, "gc": not args.no_gc}
+        run_stress(game, waves, args.output, settings)
+    else:
+        play(game)
+
+    print(particles.summary())
+    print(store.summary())
+    for pool in store.pools.values():
+        if pool.hits or pool.misses:
+            print(pool.summary())
+    print(f"Garbage collector: {gc_collections} collections, {1000 * gc_time:.2f} ms" + (" (disabled)" if args.no_gc else ""))
+    gc.enable()
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()